@@ -1,6 +1,8 @@
 """ This module was created to be the main interface between the telemetry napp and all
 other kytos napps' APIs """
 
+import asyncio
+import time
 from collections import defaultdict
 from typing import Union
 
@@ -18,6 +20,32 @@ from tenacity import (
 
 from kytos.core.retry import before_sleep
 
+# Pooled clients by base_url, so keep-alive connections are reused across requests
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _get_client(base_url: str) -> httpx.AsyncClient:
+    """Get the pooled AsyncClient of a base_url."""
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _clients[base_url] = client
+    return client
+
+
+async def aclose_clients() -> None:
+    """Close the pooled AsyncClients."""
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.aclose() for client in clients))
+
 
 @retry(
     stop=stop_after_attempt(5),
@@ -28,20 +56,52 @@ from kytos.core.retry import before_sleep
 async def get_evcs(**kwargs) -> dict:
     """Get EVCs."""
     archived = "false"
-    async with httpx.AsyncClient(base_url=settings.mef_eline_api) as client:
-        endpoint = f"/evc/?archived={archived}"
-        if kwargs:
-            query_args = [f"{k}={v}" for k, v in kwargs.items()]
-            endpoint = f"{endpoint}&{'&'.join(query_args)}"
-        response = await client.get(endpoint, timeout=10)
-        if response.is_server_error:
-            raise httpx.RequestError(response.text)
-        if not response.is_success:
-            raise UnrecoverableError(
-                f"Failed to get_evcs archived {archived}"
-                f"status code {response.status_code}, response text: {response.text}"
-            )
-        return response.json()
+    client = _get_client(settings.mef_eline_api)
+    endpoint = f"/evc/?archived={archived}"
+    if kwargs:
+        query_args = [f"{k}={v}" for k, v in kwargs.items()]
+        endpoint = f"{endpoint}&{'&'.join(query_args)}"
+    response = await client.get(endpoint, timeout=10)
+    if response.is_server_error:
+        raise httpx.RequestError(response.text)
+    if not response.is_success:
+        raise UnrecoverableError(
+            f"Failed to get_evcs archived {archived}"
+            f"status code {response.status_code}, response text: {response.text}"
+        )
+    return response.json()
+
+
+# Single-flight get_evcs tasks by query args with their monotonic ts
+_evcs_cache: dict[frozenset, tuple[float, asyncio.Task]] = {}
+
+
+async def get_evcs_cached(**kwargs) -> dict:
+    """Get EVCs sharing the same in-flight or recent get_evcs query.
+
+    Concurrent callers with the same query args share a single request, and its
+    result is reused during settings.EVCS_CACHE_TTL. The cache is invalidated
+    when EVCs metadata are added, failed requests aren't cached. The result is
+    shared by all callers, so EVCs must be copied before being mutated.
+    """
+    key = frozenset(kwargs.items())
+    now = time.monotonic()
+    cached = _evcs_cache.get(key)
+    if cached and now - cached[0] < settings.EVCS_CACHE_TTL:
+        return await asyncio.shield(cached[1])
+
+    task = asyncio.create_task(get_evcs(**kwargs))
+    task.add_done_callback(lambda t: _evict_failed_evcs_task(key, t))
+    _evcs_cache[key] = (now, task)
+    return await asyncio.shield(task)
+
+
+def _evict_failed_evcs_task(key: frozenset, task: asyncio.Task) -> None:
+    """Evict a failed get_evcs task from the cache."""
+    if not task.cancelled() and not task.exception():
+        return
+    if key in _evcs_cache and _evcs_cache[key][1] is task:
+        del _evcs_cache[key]
 
 
 @retry(
@@ -52,21 +112,43 @@ async def get_evcs(**kwargs) -> dict:
 )
 async def get_evc(evc_id: str, exclude_archived=True) -> dict:
     """Get EVC."""
-    async with httpx.AsyncClient(base_url=settings.mef_eline_api) as client:
-        response = await client.get(f"/evc/{evc_id}", timeout=10)
-        if response.status_code == 404:
-            return {}
-        if response.is_server_error:
-            raise httpx.RequestError(response.text)
-        if not response.is_success:
-            raise UnrecoverableError(
-                f"Failed to get_evc id {evc_id} "
-                f"status code {response.status_code}, response text: {response.text}"
-            )
-        data = response.json()
-        if data["archived"] and exclude_archived:
-            return {}
-        return {data["id"]: data}
+    client = _get_client(settings.mef_eline_api)
+    response = await client.get(f"/evc/{evc_id}", timeout=10)
+    if response.status_code == 404:
+        return {}
+    if response.is_server_error:
+        raise httpx.RequestError(response.text)
+    if not response.is_success:
+        raise UnrecoverableError(
+            f"Failed to get_evc id {evc_id} "
+            f"status code {response.status_code}, response text: {response.text}"
+        )
+    data = response.json()
+    if data["archived"] and exclude_archived:
+        return {}
+    return {data["id"]: data}
+
+
+async def get_evcs_by_ids(evc_ids: list[str], exclude_archived=True) -> dict:
+    """Get EVCs by ids.
+
+    Up to settings.GET_EVCS_BY_IDS_MAX ids, only the requested EVCs are fetched
+    with at most settings.GET_EVC_CONCURRENCY concurrent requests. Otherwise, if
+    archived EVCs are excluded, a single get_evcs is filtered instead. EVCs that
+    aren't found are mapped to an empty dict.
+    """
+    if exclude_archived and len(evc_ids) > settings.GET_EVCS_BY_IDS_MAX:
+        evcs = await get_evcs()
+        return {evc_id: evcs.get(evc_id, {}) for evc_id in evc_ids}
+
+    semaphore = asyncio.Semaphore(settings.GET_EVC_CONCURRENCY)
+
+    async def _get_evc(evc_id: str) -> dict:
+        async with semaphore:
+            return await get_evc(evc_id, exclude_archived)
+
+    responses = await asyncio.gather(*(_get_evc(evc_id) for evc_id in evc_ids))
+    return {evc_id: evc.get(evc_id, {}) for evc_id, evc in zip(evc_ids, responses)}
 
 
 @retry(
@@ -95,25 +177,25 @@ async def get_stored_flows(
             cookie_range_args.append(cookie[1])
 
     endpoint = "stored_flows?state=installed&state=pending"
-    async with httpx.AsyncClient(base_url=settings.flow_manager_api) as client:
-        if cookie_range_args:
-            response = await client.request(
-                "GET",
-                f"/{endpoint}",
-                json={"cookie_range": cookie_range_args},
-                timeout=10,
-            )
-        else:
-            response = await client.get(f"/{endpoint}", timeout=10)
-
-        if response.is_server_error:
-            raise httpx.RequestError(response.text)
-        if not response.is_success:
-            raise UnrecoverableError(
-                f"Failed to get_stored_flows cookies {cookies} "
-                f"status code {response.status_code}, response text: {response.text}"
-            )
-        return _map_stored_flows_by_cookies(response.json())
+    client = _get_client(settings.flow_manager_api)
+    if cookie_range_args:
+        response = await client.request(
+            "GET",
+            f"/{endpoint}",
+            json={"cookie_range": cookie_range_args},
+            timeout=10,
+        )
+    else:
+        response = await client.get(f"/{endpoint}", timeout=10)
+
+    if response.is_server_error:
+        raise httpx.RequestError(response.text)
+    if not response.is_success:
+        raise UnrecoverableError(
+            f"Failed to get_stored_flows cookies {cookies} "
+            f"status code {response.status_code}, response text: {response.text}"
+        )
+    return _map_stored_flows_by_cookies(response.json())
 
 
 def _map_stored_flows_by_cookies(stored_flows: dict) -> dict[int, list[dict]]:
@@ -145,27 +227,28 @@ async def add_evcs_metadata(
     if not circuit_ids:
         return {}
 
-    async with httpx.AsyncClient(base_url=settings.mef_eline_api) as client:
-        response = await client.post(
-            "/evc/metadata",
-            timeout=10,
-            json={
-                **new_metadata,
-                **{"circuit_ids": circuit_ids},
-            },
-        )
-        if response.is_success:
-            return response.json()
-        # Ignore 404 if force just so it's easier to handle this concurrently
-        if response.status_code == 404 and force:
-            return {}
-
-        if response.is_server_error:
-            raise httpx.RequestError(response.text)
-        raise UnrecoverableError(
-            f"Failed to add_evc_metadata for EVC ids {list(evcs.keys())} "
-            f"status code {response.status_code}, response text: {response.text}"
-        )
+    client = _get_client(settings.mef_eline_api)
+    response = await client.post(
+        "/evc/metadata",
+        timeout=10,
+        json={
+            **new_metadata,
+            **{"circuit_ids": circuit_ids},
+        },
+    )
+    _evcs_cache.clear()
+    if response.is_success:
+        return response.json()
+    # Ignore 404 if force just so it's easier to handle this concurrently
+    if response.status_code == 404 and force:
+        return {}
+
+    if response.is_server_error:
+        raise httpx.RequestError(response.text)
+    raise UnrecoverableError(
+        f"Failed to add_evc_metadata for EVC ids {list(evcs.keys())} "
+        f"status code {response.status_code}, response text: {response.text}"
+    )
 
 
 @retry(
@@ -176,22 +259,22 @@ async def add_evcs_metadata(
 )
 async def add_proxy_port_metadata(intf_id: str, port_no: int) -> dict:
     """Add proxy_port metadata."""
-    async with httpx.AsyncClient(base_url=settings.topology_url) as client:
-        response = await client.post(
-            f"/interfaces/{intf_id}/metadata",
-            timeout=10,
-            json={"proxy_port": port_no},
-        )
-        if response.is_success:
-            return response.json()
-        if response.status_code == 404:
-            raise ValueError(f"interface_id {intf_id} not found")
-        if response.is_server_error:
-            raise httpx.RequestError(response.text)
-        raise UnrecoverableError(
-            f"Failed to add_proxy_port {port_no} metadata for intf_id {intf_id} "
-            f"status code {response.status_code}, response text: {response.text}"
-        )
+    client = _get_client(settings.topology_url)
+    response = await client.post(
+        f"/interfaces/{intf_id}/metadata",
+        timeout=10,
+        json={"proxy_port": port_no},
+    )
+    if response.is_success:
+        return response.json()
+    if response.status_code == 404:
+        raise ValueError(f"interface_id {intf_id} not found")
+    if response.is_server_error:
+        raise httpx.RequestError(response.text)
+    raise UnrecoverableError(
+        f"Failed to add_proxy_port {port_no} metadata for intf_id {intf_id} "
+        f"status code {response.status_code}, response text: {response.text}"
+    )
 
 
 @retry(
@@ -202,18 +285,18 @@ async def add_proxy_port_metadata(intf_id: str, port_no: int) -> dict:
 )
 async def delete_proxy_port_metadata(intf_id: str) -> dict:
     """Delete proxy_port metadata."""
-    async with httpx.AsyncClient(base_url=settings.topology_url) as client:
-        response = await client.delete(
-            f"/interfaces/{intf_id}/metadata/proxy_port",
-            timeout=10,
-        )
-        if response.is_success:
-            return response.json()
-        if response.status_code == 404:
-            raise ValueError(f"interface_id {intf_id} or metadata proxy_port not found")
-        if response.is_server_error:
-            raise httpx.RequestError(response.text)
-        raise UnrecoverableError(
-            f"Failed to delete_proxy_port metadata for intf_id {intf_id} "
-            f"status code {response.status_code}, response text: {response.text}"
-        )
+    client = _get_client(settings.topology_url)
+    response = await client.delete(
+        f"/interfaces/{intf_id}/metadata/proxy_port",
+        timeout=10,
+    )
+    if response.is_success:
+        return response.json()
+    if response.status_code == 404:
+        raise ValueError(f"interface_id {intf_id} or metadata proxy_port not found")
+    if response.is_server_error:
+        raise httpx.RequestError(response.text)
+    raise UnrecoverableError(
+        f"Failed to delete_proxy_port metadata for intf_id {intf_id} "
+        f"status code {response.status_code}, response text: {response.text}"
+    )
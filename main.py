@@ -5,9 +5,11 @@ Napp to deploy In-band Network Telemetry over Ethernet Virtual Circuits
 """
 
 import asyncio
+import concurrent.futures
 import copy
 import pathlib
-from datetime import datetime
+import time
+from typing import Awaitable, Callable
 
 import napps.kytos.telemetry_int.kytos_api_helper as api
 from napps.kytos.telemetry_int import settings, utils
@@ -33,6 +35,20 @@ from .exceptions import (
 )
 from .managers.int import INTManager
 
+# Cookie ranges of all INT and mef_eline flows
+INT_COOKIE_RANGES = [
+    (
+        settings.INT_COOKIE_PREFIX << 56,
+        settings.INT_COOKIE_PREFIX << 56 | 0xFFFFFFFFFFFFFF,
+    ),
+]
+MEF_COOKIE_RANGES = [
+    (
+        settings.MEF_COOKIE_PREFIX << 56,
+        settings.MEF_COOKIE_PREFIX << 56 | 0xFFFFFFFFFFFFFF,
+    ),
+]
+
 
 class Main(KytosNApp):
     """Main class of kytos/telemetry NApp.
@@ -53,6 +69,14 @@ class Main(KytosNApp):
 
         self.int_manager = INTManager(self.controller)
         self._ofpt_error_lock = asyncio.Lock()
+        # OFPT_ERROR events contents pending to be handled by EVC id
+        self._ofpt_errors: dict[str, dict] = {}
+        self._ofpt_error_tasks: set[asyncio.Task] = set()
+        # EVC ids already resolved by OFPT_ERROR handling with their monotonic ts
+        self._ofpt_evcs_handled: dict[str, float] = {}
+        # Latest topology event handler pending by key while one is being handled
+        self._topo_handling: set[tuple[str, str]] = set()
+        self._topo_pending: dict[tuple[str, str], tuple[Callable, object]] = {}
 
     def execute(self):
         """Run after the setup method execution.
@@ -68,6 +92,33 @@ class Main(KytosNApp):
 
         If you have some cleanup procedure, insert it here.
         """
+        loop = self.controller.loop
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        # kytosd unloads NApps on its loop thread, which can't be blocked waiting
+        if on_loop:
+            self._shutdown_task = loop.create_task(self._ashutdown())
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self._ashutdown(), loop)
+        try:
+            future.result(timeout=settings.HTTP_CLOSE_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            log.warning(
+                f"Timed out closing httpx clients after "
+                f"{settings.HTTP_CLOSE_TIMEOUT} seconds on shutdown"
+            )
+
+    async def _ashutdown(self) -> None:
+        """Cancel pending OFPT_ERROR handling tasks and close the pooled clients."""
+        tasks = list(self._ofpt_error_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await api.aclose_clients()
 
     @rest("v1/evc/enable", methods=["POST"])
     async def enable_telemetry(self, request: Request) -> JSONResponse:
@@ -79,7 +130,7 @@ class Main(KytosNApp):
 
         try:
             content = await aget_json_or_400(request)
-            evc_ids = content["evc_ids"]
+            evc_ids = list(dict.fromkeys(content["evc_ids"]))
             force = content.get("force", False)
             if not isinstance(force, bool):
                 raise TypeError(f"'force' wrong type: {type(force)} expected bool")
@@ -87,32 +138,23 @@ class Main(KytosNApp):
             raise HTTPException(400, detail=f"Invalid payload: {content}")
 
         try:
-            evcs = (
-                await api.get_evcs()
-                if len(evc_ids) != 1
-                else await api.get_evc(evc_ids[0])
-            )
+            evcs, stored_flows = await self._get_evcs_to_enable(evc_ids)
         except RetryError as exc:
             exc_error = str(exc.last_attempt.exception())
             log.error(exc_error)
             raise HTTPException(503, detail=exc_error)
+        except UnrecoverableError as exc:
+            exc_error = str(exc)
+            log.error(exc_error)
+            raise HTTPException(500, detail=exc_error)
 
-        if evc_ids:
-            evcs = {evc_id: evcs.get(evc_id, {}) for evc_id in evc_ids}
-        else:
-            evcs = {k: v for k, v in evcs.items() if not utils.has_int_enabled(v)}
-            if not evcs:
-                # There's no non-INT EVCs to get enabled.
-                return JSONResponse(list(evcs.keys()))
+        if not evcs:
+            # There's no non-INT EVCs to get enabled.
+            return JSONResponse(list(evcs))
 
         try:
-            # First, it tries to get and remove the existing INT flows like mef_eline
-            stored_flows = await api.get_stored_flows(
-                [
-                    utils.get_cookie(evc_id, settings.INT_COOKIE_PREFIX)
-                    for evc_id in evcs
-                ]
-            )
+            for evc_id in evcs:
+                self._ofpt_evcs_handled.pop(evc_id, None)
             await self.int_manager._remove_int_flows_by_cookies(stored_flows)
             await self.int_manager.enable_int(evcs, force)
         except (EVCNotFound, FlowsNotFound, ProxyPortNotFound) as exc:
@@ -133,7 +175,29 @@ class Main(KytosNApp):
             log.error(exc_error)
             raise HTTPException(500, detail=exc_error)
 
-        return JSONResponse(list(evcs.keys()), status_code=201)
+        return JSONResponse(list(evcs), status_code=201)
+
+    async def _get_evcs_to_enable(
+        self, evc_ids: list[str]
+    ) -> tuple[dict[str, dict], dict[int, list[dict]]]:
+        """Get the EVCs to enable and their existing INT stored flows.
+
+        The existing INT flows are also returned, so they can be removed like
+        mef_eline. If evc_ids is empty, it'll get the non-INT EVCs.
+        """
+        if evc_ids:
+            evcs, stored_flows = await asyncio.gather(
+                api.get_evcs_by_ids(evc_ids),
+                api.get_stored_flows(list(map(utils.get_int_cookie, evc_ids))),
+            )
+            return evcs, stored_flows
+
+        evcs = await api.get_evcs()
+        evcs = {k: v for k, v in evcs.items() if not utils.has_int_enabled(v)}
+        if not evcs:
+            return evcs, {}
+        stored_flows = await api.get_stored_flows(list(map(utils.get_int_cookie, evcs)))
+        return evcs, stored_flows
 
     @rest("v1/evc/disable", methods=["POST"])
     async def disable_telemetry(self, request: Request) -> JSONResponse:
@@ -145,7 +209,7 @@ class Main(KytosNApp):
 
         try:
             content = await aget_json_or_400(request)
-            evc_ids = content["evc_ids"]
+            evc_ids = list(dict.fromkeys(content["evc_ids"]))
             force = content.get("force", False)
             if not isinstance(force, bool):
                 raise TypeError(f"'force' wrong type: {type(force)} expected bool")
@@ -154,22 +218,18 @@ class Main(KytosNApp):
 
         try:
             evcs = (
-                await api.get_evcs()
-                if len(evc_ids) != 1
-                else await api.get_evc(evc_ids[0])
+                await api.get_evcs_by_ids(evc_ids)
+                if evc_ids
+                else await api.get_evcs(**{"metadata.telemetry.enabled": "true"})
             )
         except RetryError as exc:
             exc_error = str(exc.last_attempt.exception())
             log.error(exc_error)
             raise HTTPException(503, detail=exc_error)
 
-        if evc_ids:
-            evcs = {evc_id: evcs.get(evc_id, {}) for evc_id in evc_ids}
-        else:
-            evcs = {k: v for k, v in evcs.items() if utils.has_int_enabled(v)}
-            if not evcs:
-                # There's no INT EVCs to get disabled.
-                return JSONResponse(list(evcs.keys()))
+        if not evcs:
+            # There's no INT EVCs to get disabled.
+            return JSONResponse(list(evcs))
 
         try:
             await self.int_manager.disable_int(evcs, force)
@@ -186,7 +246,7 @@ class Main(KytosNApp):
             log.error(exc_error)
             raise HTTPException(500, detail=exc_error)
 
-        return JSONResponse(list(evcs.keys()))
+        return JSONResponse(list(evcs))
 
     @rest("v1/evc")
     async def get_evcs(self, _request: Request) -> JSONResponse:
@@ -213,27 +273,23 @@ class Main(KytosNApp):
 
         try:
             content = await aget_json_or_400(request)
-            evc_ids = content["evc_ids"]
+            evc_ids = list(dict.fromkeys(content["evc_ids"]))
         except (TypeError, KeyError):
             raise HTTPException(400, detail=f"Invalid payload: {content}")
 
         try:
             evcs = (
-                await api.get_evcs()
-                if len(evc_ids) != 1
-                else await api.get_evc(evc_ids[0])
+                await api.get_evcs_by_ids(evc_ids)
+                if evc_ids
+                else await api.get_evcs(**{"metadata.telemetry.enabled": "true"})
             )
         except RetryError as exc:
             exc_error = str(exc.last_attempt.exception())
             log.error(exc_error)
             raise HTTPException(503, detail=exc_error)
 
-        if evc_ids:
-            evcs = {evc_id: evcs.get(evc_id, {}) for evc_id in evc_ids}
-        else:
-            evcs = {k: v for k, v in evcs.items() if utils.has_int_enabled(v)}
-            if not evcs:
-                raise HTTPException(404, detail="There aren't INT EVCs to redeploy")
+        if not evcs:
+            raise HTTPException(404, detail="There aren't INT EVCs to redeploy")
 
         try:
             await self.int_manager.redeploy_int(evcs)
@@ -250,7 +306,7 @@ class Main(KytosNApp):
             log.error(exc_error)
             raise HTTPException(500, detail=exc_error)
 
-        return JSONResponse(list(evcs.keys()), status_code=201)
+        return JSONResponse(list(evcs), status_code=201)
 
     @rest("v1/evc/compare")
     async def evc_compare(self, _request: Request) -> JSONResponse:
@@ -265,22 +321,8 @@ class Main(KytosNApp):
 
         try:
             int_flows, mef_flows, evcs = await asyncio.gather(
-                api.get_stored_flows(
-                    [
-                        (
-                            settings.INT_COOKIE_PREFIX << 56,
-                            settings.INT_COOKIE_PREFIX << 56 | 0xFFFFFFFFFFFFFF,
-                        ),
-                    ]
-                ),
-                api.get_stored_flows(
-                    [
-                        (
-                            settings.MEF_COOKIE_PREFIX << 56,
-                            settings.MEF_COOKIE_PREFIX << 56 | 0xFFFFFFFFFFFFFF,
-                        ),
-                    ]
-                ),
+                api.get_stored_flows(INT_COOKIE_RANGES),
+                api.get_stored_flows(MEF_COOKIE_RANGES),
                 api.get_evcs(),
             )
         except RetryError as exc:
@@ -409,7 +451,7 @@ class Main(KytosNApp):
                 log.error(
                     f'The table group "{group}" is not allowed for '
                     f"telemetry_int. Allowed table groups are "
-                    f"{settings.TABLE_GROUP_ALLOWED}"
+                    f"{sorted(settings.TABLE_GROUP_ALLOWED)}"
                 )
                 return
         self.int_manager.flow_builder.table_group.update(table_group)
@@ -421,14 +463,14 @@ class Main(KytosNApp):
     async def on_evc_deleted(self, event: KytosEvent) -> None:
         """On EVC deleted."""
         content = event.content
-        if (
-            "metadata" in content
-            and "telemetry" in content["metadata"]
-            and content["metadata"]["telemetry"]["enabled"]
-        ):
-            evc_id = content["id"]
-            log.info(f"Handling mef_eline.deleted on EVC id: {evc_id}")
-            await self.int_manager.disable_int({evc_id: content}, force=True)
+        evc_id = content["id"]
+        self._ofpt_evcs_handled.pop(evc_id, None)
+        telemetry = content.get("metadata", {}).get("telemetry")
+        if not telemetry or not telemetry["enabled"]:
+            return
+
+        log.info(f"Handling mef_eline.deleted on EVC id: {evc_id}")
+        await self.int_manager.disable_int({evc_id: content}, force=True)
 
     @alisten_to("kytos/mef_eline.deployed")
     async def on_evc_deployed(self, event: KytosEvent) -> None:
@@ -461,26 +503,18 @@ class Main(KytosNApp):
     async def on_evc_undeployed(self, event: KytosEvent) -> None:
         """On EVC undeployed."""
         content = event.content
-        if (
-            not content["enabled"]
-            and "metadata" in content
-            and "telemetry" in content["metadata"]
-            and content["metadata"]["telemetry"]["enabled"]
-        ):
-            metadata = {
-                "telemetry": {
-                    "enabled": True,
-                    "status": "DOWN",
-                    "status_reason": ["undeployed"],
-                    "status_updated_at": datetime.utcnow().strftime(
-                        "%Y-%m-%dT%H:%M:%S"
-                    ),
-                }
-            }
-            evc_id = content["id"]
-            evcs = {evc_id: content}
-            log.info(f"Handling mef_eline.undeployed on EVC id: {evc_id}")
-            await self.int_manager.remove_int_flows(evcs, metadata, force=True)
+        evc_id = content["id"]
+        self._ofpt_evcs_handled.pop(evc_id, None)
+        if content["enabled"]:
+            return
+        telemetry = content.get("metadata", {}).get("telemetry")
+        if not telemetry or not telemetry["enabled"]:
+            return
+
+        metadata = utils.get_status_metadata(True, "DOWN", ["undeployed"])
+        evcs = {evc_id: content}
+        log.info(f"Handling mef_eline.undeployed on EVC id: {evc_id}")
+        await self.int_manager.remove_int_flows(evcs, metadata, force=True)
 
     @alisten_to("kytos/mef_eline.(redeployed_link_down|redeployed_link_up)")
     async def on_evc_redeployed_link(self, event: KytosEvent) -> None:
@@ -514,16 +548,9 @@ class Main(KytosNApp):
             and "telemetry" in content["metadata"]
             and content["metadata"]["telemetry"]["enabled"]
         ):
-            metadata = {
-                "telemetry": {
-                    "enabled": True,
-                    "status": "DOWN",
-                    "status_reason": ["redeployed_link_down_no_path"],
-                    "status_updated_at": datetime.utcnow().strftime(
-                        "%Y-%m-%dT%H:%M:%S"
-                    ),
-                }
-            }
+            metadata = utils.get_status_metadata(
+                True, "DOWN", ["redeployed_link_down_no_path"]
+            )
             evc_id = content["id"]
             evcs = {evc_id: content}
             log.info(
@@ -552,15 +579,52 @@ class Main(KytosNApp):
             copy.deepcopy(event.content), event_name="failover_deployed"
         )
 
+    async def _handle_coalesced(
+        self, key: tuple[str, str], handler: Callable[..., Awaitable], arg
+    ) -> None:
+        """Handle a topology event coalescing it by key.
+
+        If an event with the same key is being handled, only the latest one is
+        kept pending to be handled next, the superseded ones are discarded since
+        the handlers act on the current state of the link or interface. A failed
+        handling is logged and the pending one is still handled afterwards.
+        """
+        if key in self._topo_handling:
+            self._topo_pending[key] = (handler, arg)
+            return
+
+        self._topo_handling.add(key)
+        try:
+            while True:
+                try:
+                    await handler(arg)
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.exception(
+                        f"Failed to handle {key[0]} {key[1]} event, "
+                        f"exception: {str(exc)}"
+                    )
+                if key not in self._topo_pending:
+                    break
+                handler, arg = self._topo_pending.pop(key)
+        finally:
+            self._topo_handling.discard(key)
+            self._topo_pending.pop(key, None)
+
     @alisten_to("kytos/topology.link_down")
     async def on_link_down(self, event):
         """Handle topology.link_down."""
-        await self.int_manager.handle_pp_link_down(event.content["link"])
+        link = event.content["link"]
+        await self._handle_coalesced(
+            ("link", link.id), self.int_manager.handle_pp_link_down, link
+        )
 
     @alisten_to("kytos/topology.link_up")
     async def on_link_up(self, event):
         """Handle topology.link_up."""
-        await self.int_manager.handle_pp_link_up(event.content["link"])
+        link = event.content["link"]
+        await self._handle_coalesced(
+            ("link", link.id), self.int_manager.handle_pp_link_up, link
+        )
 
     @alisten_to("kytos/mef_eline.uni_active_updated")
     async def on_uni_active_updated(self, event: KytosEvent) -> None:
@@ -577,16 +641,9 @@ class Main(KytosNApp):
                 f"on EVC id: {evc_id}"
             )
 
-            metadata = {
-                "telemetry": {
-                    "enabled": True,
-                    "status": "UP" if active else "DOWN",
-                    "status_reason": [] if active else ["uni_down"],
-                    "status_updated_at": datetime.utcnow().strftime(
-                        "%Y-%m-%dT%H:%M:%S"
-                    ),
-                }
-            }
+            metadata = utils.get_status_metadata(
+                True, "UP" if active else "DOWN", [] if active else ["uni_down"]
+            )
             await api.add_evcs_metadata({evc_id: content}, metadata)
 
     @alisten_to("kytos/flow_manager.flow.error")
@@ -595,53 +652,89 @@ class Main(KytosNApp):
 
         Only OFPT_ERRORs will be handled, telemetry_int already uses force: true
         """
-        flow = event.content["flow"]
-        if any(
-            (
-                event.content.get("error_exception"),
-                event.content.get("error_command") != "add",
-                flow.cookie >> 56 != settings.INT_COOKIE_PREFIX,
-            )
+        content = event.content
+        flow = content["flow"]
+        if flow.cookie >> 56 != settings.INT_COOKIE_PREFIX:
+            return
+        if content.get("error_command") != "add" or content.get("error_exception"):
+            return
+
+        evc_id = utils.get_id_from_cookie(flow.cookie)
+        handled_at = self._ofpt_evcs_handled.get(evc_id)
+        if (
+            handled_at is not None
+            and time.monotonic() - handled_at < settings.OFPT_ERROR_EVC_CACHE_TTL
         ):
             return
 
+        # Errors are coalesced by EVC id and handled after a debounce interval,
+        # so an OFPT_ERROR storm results in a single INT removal per EVC
+        if not self._ofpt_errors:
+            task = asyncio.create_task(self._handle_ofpt_errors())
+            self._ofpt_error_tasks.add(task)
+            task.add_done_callback(self._ofpt_error_tasks.discard)
+        self._ofpt_errors[evc_id] = content
+
+    async def _handle_ofpt_errors(self) -> None:
+        """Handle coalesced OFPT_ERRORs disabling INT on their EVCs."""
+        await asyncio.sleep(settings.OFPT_ERROR_DEBOUNCE_INTERVAL)
         async with self._ofpt_error_lock:
-            evc_id = utils.get_id_from_cookie(flow.cookie)
-            evc = await api.get_evc(evc_id, exclude_archived=False)
-            if (
-                not evc
-                or "telemetry" not in evc[evc_id]["metadata"]
-                or "enabled" not in evc[evc_id]["metadata"]["telemetry"]
-                or not evc[evc_id]["metadata"]["telemetry"]["enabled"]
-            ):
-                return
-
-            metadata = {
-                "telemetry": {
-                    "enabled": False,
-                    "status": "DOWN",
-                    "status_reason": ["ofpt_error"],
-                    "status_updated_at": datetime.utcnow().strftime(
-                        "%Y-%m-%dT%H:%M:%S"
-                    ),
-                }
-            }
-            log.error(
-                f"Disabling EVC({evc_id}) due to OFPT_ERROR, "
-                f"error_type: {event.content.get('error_type')}, "
-                f"error_code: {event.content.get('error_code')}, "
-                f"flow: {flow.as_dict()} "
-            )
+            errors, self._ofpt_errors = self._ofpt_errors, {}
+            try:
+                evcs = await api.get_evcs_by_ids(list(errors), exclude_archived=False)
+                evcs = {k: v for k, v in evcs.items() if utils.has_int_enabled(v)}
+                if evcs:
+                    metadata = utils.get_status_metadata(False, "DOWN", ["ofpt_error"])
+                    for evc_id in evcs:
+                        content = errors[evc_id]
+                        log.error(
+                            f"Disabling EVC({evc_id}) due to OFPT_ERROR, "
+                            f"error_type: {content.get('error_type')}, "
+                            f"error_code: {content.get('error_code')}, "
+                            f"flow: {content['flow'].as_dict()} "
+                        )
+                    await self.int_manager.remove_int_flows(evcs, metadata, force=True)
+                # only successfully handled EVCs get their next errors suppressed
+                self._cache_ofpt_evcs_handled(errors)
+            except RetryError as exc:
+                log.error(
+                    f"Failed to handle OFPT_ERROR on EVC ids: {list(errors)}, "
+                    f"{str(exc.last_attempt.exception())}"
+                )
+            except UnrecoverableError as exc:
+                log.error(
+                    f"Failed to handle OFPT_ERROR on EVC ids: {list(errors)}, "
+                    f"{str(exc)}"
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                log.exception(
+                    f"Failed to handle OFPT_ERROR on EVC ids: {list(errors)}, "
+                    f"{str(exc)}"
+                )
 
-            evcs = {evc_id: {evc_id: evc_id}}
-            await self.int_manager.remove_int_flows(evcs, metadata, force=True)
+    def _cache_ofpt_evcs_handled(self, evc_ids) -> None:
+        """Cache EVC ids handled by OFPT_ERROR, evicting the expired ones."""
+        now = time.monotonic()
+        self._ofpt_evcs_handled = {
+            evc_id: handled_at
+            for evc_id, handled_at in self._ofpt_evcs_handled.items()
+            if now - handled_at < settings.OFPT_ERROR_EVC_CACHE_TTL
+        }
+        for evc_id in evc_ids:
+            self._ofpt_evcs_handled[evc_id] = now
 
     @alisten_to("kytos/topology.interfaces.metadata.removed")
     async def on_intf_metadata_removed(self, event: KytosEvent) -> None:
         """On interface metadata removed."""
-        await self.int_manager.handle_pp_metadata_removed(event.content["interface"])
+        intf = event.content["interface"]
+        await self._handle_coalesced(
+            ("interface", intf.id), self.int_manager.handle_pp_metadata_removed, intf
+        )
 
     @alisten_to("kytos/topology.interfaces.metadata.added")
     async def on_intf_metadata_added(self, event: KytosEvent) -> None:
         """On interface metadata added."""
-        await self.int_manager.handle_pp_metadata_added(event.content["interface"])
+        intf = event.content["interface"]
+        await self._handle_coalesced(
+            ("interface", intf.id), self.int_manager.handle_pp_metadata_added, intf
+        )
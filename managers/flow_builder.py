@@ -30,6 +30,7 @@ class FlowBuilder:
         """
         flows_per_cookie: dict[int, list[dict]] = defaultdict(list)
         for evc_id, evc in evcs.items():
+            cookie = utils.get_cookie(evc_id, settings.MEF_COOKIE_PREFIX)
             for flow in itertools.chain(
                 self._build_int_source_flows("uni_a", evc, stored_flows),
                 self._build_int_source_flows("uni_z", evc, stored_flows),
@@ -37,7 +38,6 @@ class FlowBuilder:
                 self._build_int_sink_flows("uni_z", evc, stored_flows),
                 self._build_int_sink_flows("uni_a", evc, stored_flows),
             ):
-                cookie = utils.get_cookie(evc_id, settings.MEF_COOKIE_PREFIX)
                 flows_per_cookie[cookie].append(flow)
         return flows_per_cookie
 
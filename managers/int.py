@@ -3,8 +3,8 @@
 import asyncio
 import copy
 from collections import defaultdict
-from datetime import datetime
-from typing import Literal, Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Literal, Optional
 
 from pyof.v0x04.controller2switch.table_mod import Table
 
@@ -34,6 +34,9 @@ from napps.kytos.telemetry_int.exceptions import (
     ProxyPortShared,
 )
 
+_COOKIE_MASK = 0xFFFFFFFFFFFFFFFF
+_TABLE_ALL = Table.OFPTT_ALL.value
+
 
 class INTManager:
     """INTManager encapsulates and aggregates telemetry-related functionalities."""
@@ -42,8 +45,10 @@ class INTManager:
         """INTManager."""
         self.controller = controller
         self.flow_builder = FlowBuilder()
-        self._topo_link_lock = asyncio.Lock()
-        self._intf_meta_lock = asyncio.Lock()
+        # Locks by ProxyPort source intf id to serialize its topology events
+        self._pp_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Generations by ProxyPort source intf id, bumped on each locked handling
+        self._pp_gens: dict[str, int] = defaultdict(int)
 
         # Keep track between each uni intf id and its src intf id port
         self.unis_src: dict[str, str] = {}
@@ -92,6 +97,54 @@ class INTManager:
                         f"of UNI {uni_z_id}. You need to set a correct proxy_port value"
                     )
 
+    def _lock_for(self, pp: ProxyPort) -> asyncio.Lock:
+        """Get the lock of a ProxyPort.
+
+        Events of independent proxy ports don't need to wait for each other,
+        there's one lock per ProxyPort, which are bounded by srcs_pp.
+        """
+        return self._pp_locks[pp.source.id]
+
+    @asynccontextmanager
+    async def _prefetched_lock(
+        self, pp: ProxyPort, fetch: Callable[[], Awaitable[dict[str, dict]]]
+    ) -> AsyncIterator[dict[str, dict]]:
+        """Fetch EVCs without holding the ProxyPort lock, and re-validate within it.
+
+        If another handling of the same ProxyPort happened while fetching, the
+        EVCs are fetched again within the lock. Only EVCs still in pp.evc_ids
+        are yielded.
+        """
+        key = pp.source.id
+        gen = self._pp_gens[key]
+        evcs = await fetch()
+        async with self._lock_for(pp):
+            try:
+                if self._pp_gens[key] != gen:
+                    evcs = await fetch()
+                yield {
+                    evc_id: evc for evc_id, evc in evcs.items() if evc_id in pp.evc_ids
+                }
+            finally:
+                self._pp_gens[key] += 1
+
+    async def _get_pp_int_evcs(
+        self, pp: ProxyPort, status: Optional[str] = None
+    ) -> dict[str, dict]:
+        """Get the INT EVCs of a ProxyPort, optionally with a given telemetry status.
+
+        The cached EVCs are shared, so only the ProxyPort ones get copied.
+        """
+        query = {"metadata.telemetry.enabled": "true"}
+        if status:
+            query["metadata.telemetry.status"] = status
+        evcs = await api.get_evcs_cached(**query)
+        return {
+            evc_id: copy.deepcopy(evc)
+            for evc_id, evc in evcs.items()
+            if evc_id in pp.evc_ids
+        }
+
     async def handle_pp_link_down(self, link: Link) -> None:
         """Handle proxy_port link_down."""
         if not settings.FALLBACK_TO_MEF_LOOP_DOWN:
@@ -102,16 +155,9 @@ class INTManager:
         if not pp or not pp.evc_ids:
             return
 
-        async with self._topo_link_lock:
-            evcs = await api.get_evcs(
-                **{
-                    "metadata.telemetry.enabled": "true",
-                    "metadata.telemetry.status": "UP",
-                }
-            )
-            to_deactivate = {
-                evc_id: evc for evc_id, evc in evcs.items() if evc_id in pp.evc_ids
-            }
+        async with self._prefetched_lock(
+            pp, lambda: self._get_pp_int_evcs(pp, "UP")
+        ) as to_deactivate:
             if not to_deactivate:
                 return
 
@@ -119,18 +165,14 @@ class INTManager:
                 f"Handling link_down {link}, removing INT flows falling back to "
                 f"mef_eline, EVC ids: {list(to_deactivate)}"
             )
-            metadata = {
-                "telemetry": {
-                    "enabled": True,
-                    "status": "DOWN",
-                    "status_reason": ["proxy_port_down"],
-                    "status_updated_at": datetime.utcnow().strftime(
-                        "%Y-%m-%dT%H:%M:%S"
-                    ),
-                }
-            }
+            metadata = utils.get_status_metadata(True, "DOWN", ["proxy_port_down"])
             await self.remove_int_flows(to_deactivate, metadata)
 
+    @staticmethod
+    def _is_link_up(link: Link) -> bool:
+        """Check whether a link is UP without any status reason."""
+        return link.status == EntityStatus.UP and not link.status_reason
+
     async def handle_pp_link_up(self, link: Link) -> None:
         """Handle proxy_port link_up."""
         if not settings.FALLBACK_TO_MEF_LOOP_DOWN:
@@ -138,29 +180,23 @@ class INTManager:
         pp = self.srcs_pp.get(link.endpoint_a.id)
         if not pp:
             pp = self.srcs_pp.get(link.endpoint_b.id)
-        if not pp or not pp.evc_ids:
+        if not pp or not pp.evc_ids or not self._is_link_up(link):
             return
 
-        async with self._topo_link_lock:
-            if link.status != EntityStatus.UP or link.status_reason:
+        async with self._prefetched_lock(
+            pp, lambda: self._get_pp_int_evcs(pp, "DOWN")
+        ) as evcs:
+            # the link might have changed while fetching or waiting for the lock
+            if not self._is_link_up(link):
                 return
-            evcs = await api.get_evcs(
-                **{
-                    "metadata.telemetry.enabled": "true",
-                    "metadata.telemetry.status": "DOWN",
-                }
-            )
 
             to_install = {}
             for evc_id, evc in evcs.items():
-                if any(
-                    (
-                        not evc["active"],
-                        evc["archived"],
-                        evc_id not in pp.evc_ids,
-                        evc["uni_a"]["interface_id"] not in self.unis_src,
-                        evc["uni_z"]["interface_id"] not in self.unis_src,
-                    )
+                if (
+                    not evc["active"]
+                    or evc["archived"]
+                    or evc["uni_a"]["interface_id"] not in self.unis_src
+                    or evc["uni_z"]["interface_id"] not in self.unis_src
                 ):
                     continue
 
@@ -187,16 +223,7 @@ class INTManager:
                 f"Handling link_up {link}, deploying INT flows, "
                 f"EVC ids: {list(to_install)}"
             )
-            metadata = {
-                "telemetry": {
-                    "enabled": True,
-                    "status": "UP",
-                    "status_reason": [],
-                    "status_updated_at": datetime.utcnow().strftime(
-                        "%Y-%m-%dT%H:%M:%S"
-                    ),
-                }
-            }
+            metadata = utils.get_status_metadata(True, "UP", [])
             try:
                 await self.install_int_flows(to_install, metadata)
             except FlowsNotFound as exc:
@@ -214,16 +241,11 @@ class INTManager:
         except KeyError:
             return
 
-        async with self._intf_meta_lock:
-            evcs = await api.get_evcs(
-                **{
-                    "metadata.telemetry.enabled": "true",
-                    "metadata.telemetry.status": "UP",
-                }
-            )
-            affected_evcs = {
-                evc_id: evc for evc_id, evc in evcs.items() if evc_id in pp.evc_ids
-            }
+        async with self._prefetched_lock(
+            pp, lambda: self._get_pp_int_evcs(pp, "UP")
+        ) as affected_evcs:
+            if "proxy_port" in intf.metadata:
+                return
             if not affected_evcs:
                 return
 
@@ -257,15 +279,11 @@ class INTManager:
         if cur_source_intf == pp.source:
             return
 
-        async with self._intf_meta_lock:
-            evcs = await api.get_evcs(
-                **{
-                    "metadata.telemetry.enabled": "true",
-                }
-            )
-            affected_evcs = {
-                evc_id: evc for evc_id, evc in evcs.items() if evc_id in pp.evc_ids
-            }
+        async with self._prefetched_lock(
+            pp, lambda: self._get_pp_int_evcs(pp)
+        ) as affected_evcs:
+            if "proxy_port" not in intf.metadata:
+                return
             if not affected_evcs:
                 return
 
@@ -285,16 +303,9 @@ class INTManager:
                     f" EVC ids: {list(affected_evcs)}, exception {str(exc)}"
                 )
                 log.error(msg)
-                metadata = {
-                    "telemetry": {
-                        "enabled": False,
-                        "status": "DOWN",
-                        "status_reason": ["proxy_port_shared"],
-                        "status_updated_at": datetime.utcnow().strftime(
-                            "%Y-%m-%dT%H:%M:%S"
-                        ),
-                    }
-                }
+                metadata = utils.get_status_metadata(
+                    False, "DOWN", ["proxy_port_shared"]
+                )
                 await api.add_evcs_metadata(affected_evcs, metadata)
 
     async def disable_int(
@@ -314,14 +325,7 @@ class INTManager:
         self._validate_disable_evcs(evcs, force)
         log.info(f"Disabling INT on EVC ids: {list(evcs.keys())}, force: {force}")
 
-        metadata = {
-            "telemetry": {
-                "enabled": False,
-                "status": "DOWN",
-                "status_reason": [reason],
-                "status_updated_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"),
-            }
-        }
+        metadata = utils.get_status_metadata(False, "DOWN", [reason])
         await self.remove_int_flows(evcs, metadata, force=force)
         self._discard_pps_evc_ids(evcs)
 
@@ -329,9 +333,7 @@ class INTManager:
         self, evcs: dict[str, dict], metadata: dict, force=False
     ) -> None:
         """Remove INT flows and set metadata on EVCs."""
-        stored_flows = await api.get_stored_flows(
-            [utils.get_cookie(evc_id, settings.INT_COOKIE_PREFIX) for evc_id in evcs]
-        )
+        stored_flows = await api.get_stored_flows(list(map(utils.get_int_cookie, evcs)))
         await asyncio.gather(
             self._remove_int_flows_by_cookies(stored_flows),
             api.add_evcs_metadata(evcs, metadata, force),
@@ -352,14 +354,7 @@ class INTManager:
         evcs = self._validate_map_enable_evcs(evcs, force)
         log.info(f"Enabling INT on EVC ids: {list(evcs.keys())}, force: {force}")
 
-        metadata = {
-            "telemetry": {
-                "enabled": True,
-                "status": "UP",
-                "status_reason": [],
-                "status_updated_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"),
-            }
-        }
+        metadata = utils.get_status_metadata(True, "UP", [])
         await self.install_int_flows(evcs, metadata)
         self._add_pps_evc_ids(evcs)
 
@@ -372,18 +367,9 @@ class INTManager:
         evcs = self._validate_map_enable_evcs(evcs, force=True)
         log.info(f"Redeploying INT on EVC ids: {list(evcs.keys())}, force: True")
 
-        stored_flows = await api.get_stored_flows(
-            [utils.get_cookie(evc_id, settings.INT_COOKIE_PREFIX) for evc_id in evcs]
-        )
+        stored_flows = await api.get_stored_flows(list(map(utils.get_int_cookie, evcs)))
         await self._remove_int_flows_by_cookies(stored_flows)
-        metadata = {
-            "telemetry": {
-                "enabled": True,
-                "status": "UP",
-                "status_reason": [],
-                "status_updated_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"),
-            }
-        }
+        metadata = utils.get_status_metadata(True, "UP", [])
         await self.install_int_flows(evcs, metadata, force=True)
 
     async def install_int_flows(
@@ -392,50 +378,60 @@ class INTManager:
         """Install INT flows and set metadata on EVCs."""
         stored_flows = self.flow_builder.build_int_flows(
             evcs,
-            await utils.get_found_stored_flows(
-                [
-                    utils.get_cookie(evc_id, settings.MEF_COOKIE_PREFIX)
-                    for evc_id in evcs
-                ]
-            ),
+            await utils.get_found_stored_flows(list(map(utils.get_mef_cookie, evcs))),
         )
         self._validate_evcs_stored_flows(evcs, stored_flows)
 
         active_evcs, inactive_evcs, pp_down_evcs = {}, {}, {}
         for evc_id, evc in evcs.items():
             if not evc["active"]:
-                inactive_evcs[evc_id] = evc
-                continue
-            if any(
-                (
-                    evc["uni_a"]["proxy_port"].status != EntityStatus.UP,
-                    evc["uni_z"]["proxy_port"].status != EntityStatus.UP,
-                )
+                bucket = inactive_evcs
+            elif (
+                evc["uni_a"]["proxy_port"].status != EntityStatus.UP
+                or evc["uni_z"]["proxy_port"].status != EntityStatus.UP
             ):
-                pp_down_evcs[evc_id] = evc
-                continue
-            active_evcs[evc_id] = evc
-
-        inactive_metadata = copy.deepcopy(metadata)
-        inactive_metadata["telemetry"]["status"] = "DOWN"
-        pp_down_metadata = copy.deepcopy(inactive_metadata)
-        inactive_metadata["telemetry"]["status_reason"] = ["no_flows"]
-        pp_down_metadata["telemetry"]["status_reason"] = ["proxy_port_down"]
-
-        await asyncio.gather(
-            self._install_int_flows(stored_flows),
-            api.add_evcs_metadata(inactive_evcs, inactive_metadata, force),
-            api.add_evcs_metadata(pp_down_evcs, pp_down_metadata, force),
-            api.add_evcs_metadata(active_evcs, metadata, force),
+                bucket = pp_down_evcs
+            else:
+                bucket = active_evcs
+            bucket[evc_id] = evc
+
+        telemetry = metadata["telemetry"]
+        inactive_metadata = utils.get_status_metadata(
+            telemetry["enabled"], "DOWN", ["no_flows"], telemetry["status_updated_at"]
+        )
+        pp_down_metadata = utils.get_status_metadata(
+            telemetry["enabled"],
+            "DOWN",
+            ["proxy_port_down"],
+            telemetry["status_updated_at"],
         )
 
+        coros = [self._install_int_flows(stored_flows)]
+        for bucket, bucket_metadata in (
+            (inactive_evcs, inactive_metadata),
+            (pp_down_evcs, pp_down_metadata),
+            (active_evcs, metadata),
+        ):
+            if bucket:
+                coros.append(api.add_evcs_metadata(bucket, bucket_metadata, force))
+        await asyncio.gather(*coros)
+
     def get_proxy_port_or_raise(
-        self, intf_id: str, evc_id: str, new_port_number: Optional[int] = None
+        self,
+        intf_id: str,
+        evc_id: str,
+        new_port_number: Optional[int] = None,
+        cache: Optional[dict[str, ProxyPort]] = None,
     ) -> ProxyPort:
         """Return a ProxyPort assigned to a UNI or raise.
 
         new_port_number can be set and used to validate a new port_number.
+
+        cache can be set to reuse the ProxyPorts already found by UNI across
+        multiple calls, typically when iterating over EVCs sharing UNIs.
         """
+        if cache is not None and new_port_number is None and intf_id in cache:
+            return cache[intf_id]
 
         interface = self.controller.get_interface_by_id(intf_id)
         if not interface:
@@ -464,6 +460,8 @@ class INTManager:
                 evc_id, f"proxy_port {port_no} of UNI {intf_id} isn't looped"
             )
 
+        if cache is not None and new_port_number is None:
+            cache[intf_id] = pp
         return pp
 
     def _validate_disable_evcs(
@@ -483,9 +481,7 @@ class INTManager:
     ) -> None:
         """Validate that each active EVC has corresponding flows."""
         for evc_id, evc in evcs.items():
-            if evc["active"] and not stored_flows.get(
-                utils.get_cookie(evc_id, settings.MEF_COOKIE_PREFIX)
-            ):
+            if evc["active"] and not stored_flows.get(utils.get_mef_cookie(evc_id)):
                 raise FlowsNotFound(evc_id)
 
     def _validate_intra_evc_different_proxy_ports(self, evc: dict) -> None:
@@ -498,13 +494,7 @@ class INTManager:
         """
         pp_a = evc["uni_a"].get("proxy_port")
         pp_z = evc["uni_z"].get("proxy_port")
-        if any(
-            (
-                not utils.is_intra_switch_evc(evc),
-                pp_a is None,
-                pp_z is None,
-            )
-        ):
+        if pp_a is None or pp_z is None or not utils.is_intra_switch_evc(evc):
             return
         if pp_a.source != pp_z.source:
             return
@@ -579,14 +569,19 @@ class INTManager:
 
         old_flows_key = "removed_flows"
         new_flows_key = "flows"
+        pps: dict[str, ProxyPort] = {}
 
         for evc_id, evc in evcs_content.items():
             if not utils.has_int_enabled(evc):
                 continue
             try:
                 uni_a, uni_z = utils.get_evc_unis(evc)
-                pp_a = self.get_proxy_port_or_raise(uni_a["interface_id"], evc_id)
-                pp_z = self.get_proxy_port_or_raise(uni_z["interface_id"], evc_id)
+                pp_a = self.get_proxy_port_or_raise(
+                    uni_a["interface_id"], evc_id, cache=pps
+                )
+                pp_z = self.get_proxy_port_or_raise(
+                    uni_z["interface_id"], evc_id, cache=pps
+                )
                 uni_a["proxy_port"], uni_z["proxy_port"] = pp_a, pp_z
                 evc["id"] = evc_id
                 evc["uni_a"], evc["uni_z"] = uni_a, uni_z
@@ -619,6 +614,32 @@ class INTManager:
                 to_remove[evc_id] = evc
                 evc.pop(old_flows_key, None)
 
+        coros = [
+            self._update_failover_flows(
+                event_name, to_remove, old_flows, to_install, new_flows
+            )
+        ]
+        if to_remove_with_err:
+            log.error(
+                f"Handling {event_name} proxy_port_error falling back "
+                f"to mef_eline, EVC ids: {list(to_remove_with_err.keys())}"
+            )
+            metadata = utils.get_status_metadata(True, "DOWN", ["proxy_port_error"])
+            coros.append(
+                self.remove_int_flows(to_remove_with_err, metadata, force=True)
+            )
+        # EVCs with proxy port errors are disjoint from the ones being updated
+        await asyncio.gather(*coros)
+
+    async def _update_failover_flows(
+        self,
+        event_name: str,
+        to_remove: dict[str, dict],
+        old_flows: dict[int, list[dict]],
+        to_install: dict[str, dict],
+        new_flows: dict[int, list[dict]],
+    ) -> None:
+        """Update failover INT flows, old flows are removed before installing."""
         if to_remove:
             log.info(
                 f"Handling {event_name} flows remove on EVC ids: {to_remove.keys()}"
@@ -626,22 +647,6 @@ class INTManager:
             await self._remove_int_flows(
                 self.flow_builder.build_failover_old_flows(to_remove, old_flows)
             )
-        if to_remove_with_err:
-            log.error(
-                f"Handling {event_name} proxy_port_error falling back "
-                f"to mef_eline, EVC ids: {list(to_remove_with_err.keys())}"
-            )
-            metadata = {
-                "telemetry": {
-                    "enabled": True,
-                    "status": "DOWN",
-                    "status_reason": ["proxy_port_error"],
-                    "status_updated_at": datetime.utcnow().strftime(
-                        "%Y-%m-%dT%H:%M:%S"
-                    ),
-                }
-            }
-            await self.remove_int_flows(to_remove_with_err, metadata, force=True)
         if to_install:
             log.info(
                 f"Handling {event_name} flows install on EVC ids: {to_install.keys()}"
@@ -672,6 +677,7 @@ class INTManager:
         so it can be reused later during provisioning.
 
         """
+        pps: dict[str, ProxyPort] = {}
         for evc_id, evc in evcs.items():
             if not evc:
                 raise EVCNotFound(evc_id)
@@ -679,8 +685,12 @@ class INTManager:
                 raise EVCHasINT(evc_id)
 
             uni_a, uni_z = utils.get_evc_unis(evc)
-            pp_a = self.get_proxy_port_or_raise(uni_a["interface_id"], evc_id)
-            pp_z = self.get_proxy_port_or_raise(uni_z["interface_id"], evc_id)
+            pp_a = self.get_proxy_port_or_raise(
+                uni_a["interface_id"], evc_id, cache=pps
+            )
+            pp_z = self.get_proxy_port_or_raise(
+                uni_z["interface_id"], evc_id, cache=pps
+            )
 
             uni_a["proxy_port"], uni_z["proxy_port"] = pp_a, pp_z
             evc["uni_a"], evc["uni_z"] = uni_a, uni_z
@@ -718,14 +728,17 @@ class INTManager:
 
         This is meant to be called after an EVC is enabled.
         """
+        pps: dict[str, ProxyPort] = {}
         for evc_id, evc in evcs.items():
-            uni_a, uni_z = utils.get_evc_unis(evc)
-            pp_a = self.get_proxy_port_or_raise(uni_a["interface_id"], evc_id)
-            pp_z = self.get_proxy_port_or_raise(uni_z["interface_id"], evc_id)
-            pp_a.evc_ids.add(evc_id)
-            pp_z.evc_ids.add(evc_id)
-            self.unis_src[evc["uni_a"]["interface_id"]] = pp_a.source.id
-            self.unis_src[evc["uni_z"]["interface_id"]] = pp_z.source.id
+            for uni in (evc["uni_a"], evc["uni_z"]):
+                # ProxyPorts are usually already mapped by _validate_map_enable_evcs
+                pp = uni.get("proxy_port")
+                if pp is None:
+                    pp = self.get_proxy_port_or_raise(
+                        uni["interface_id"], evc_id, cache=pps
+                    )
+                pp.evc_ids.add(evc_id)
+                self.unis_src[uni["interface_id"]] = pp.source.id
 
     def _discard_pps_evc_ids(self, evcs: dict[str, dict]) -> None:
         """Discard proxy port evc_ids.
@@ -733,19 +746,19 @@ class INTManager:
         This is meant to be called when an EVC is disabled.
         """
         for evc_id, evc in evcs.items():
-            uni_a, uni_z = utils.get_evc_unis(evc)
+            uni_a, uni_z = evc["uni_a"], evc["uni_z"]
             try:
                 pp_a = self.srcs_pp[self.unis_src[uni_a["interface_id"]]]
                 pp_a.evc_ids.discard(evc_id)
                 if not pp_a.evc_ids:
-                    self.unis_src.pop(evc["uni_a"]["interface_id"], None)
+                    self.unis_src.pop(uni_a["interface_id"], None)
             except KeyError:
                 pass
             try:
                 pp_z = self.srcs_pp[self.unis_src[uni_z["interface_id"]]]
                 pp_z.evc_ids.discard(evc_id)
                 if not pp_z.evc_ids:
-                    self.unis_src.pop(evc["uni_z"]["interface_id"], None)
+                    self.unis_src.pop(uni_z["interface_id"], None)
             except KeyError:
                 pass
 
@@ -759,36 +772,23 @@ class INTManager:
         - INT enabled but has less flows than mef flows -> missing_some_int_flows
 
         """
-        int_flows = {
-            utils.get_id_from_cookie(k): v for k, v in stored_int_flows.items()
+        int_lens = {
+            utils.get_id_from_cookie(k): len(v) for k, v in stored_int_flows.items()
         }
-        mef_flows = {
-            utils.get_id_from_cookie(k): v for k, v in stored_mef_flows.items()
+        mef_lens = {
+            utils.get_id_from_cookie(k): len(v) for k, v in stored_mef_flows.items()
         }
 
         results = defaultdict(list)
         for evc in evcs.values():
             evc_id = evc["id"]
+            int_enabled = utils.has_int_enabled(evc)
+            int_len = int_lens.get(evc_id, 0)
 
-            if (
-                not utils.has_int_enabled(evc)
-                and evc_id in int_flows
-                and int_flows[evc_id]
-            ):
+            if not int_enabled and int_len:
                 results[evc_id].append("wrong_metadata_has_int_flows")
 
-            if (
-                utils.has_int_enabled(evc)
-                and evc_id in mef_flows
-                and mef_flows[evc_id]
-                and (
-                    evc_id not in int_flows
-                    or (
-                        evc_id in int_flows
-                        and len(int_flows[evc_id]) < len(mef_flows[evc_id])
-                    )
-                )
-            ):
+            if int_enabled and int_len < mef_lens.get(evc_id, 0):
                 results[evc_id].append("missing_some_int_flows")
         return results
 
@@ -804,19 +804,19 @@ class INTManager:
         be able to handle the force mode when an EVC no longer exists. It also follows
         the same pattern that mef_eline currently uses.
         """
-        switch_flows_cookies = defaultdict(set)
+        switch_cookies = defaultdict(set)
+        switch_flows = defaultdict(list)
         for flows in stored_flows.values():
             for flow in flows:
-                switch_flows_cookies[flow["switch"]].add(flow["flow"]["cookie"])
-
-        switch_flows = defaultdict(list)
-        for dpid, cookies in switch_flows_cookies.items():
-            for cookie in cookies:
+                dpid, cookie = flow["switch"], flow["flow"]["cookie"]
+                if cookie in switch_cookies[dpid]:
+                    continue
+                switch_cookies[dpid].add(cookie)
                 switch_flows[dpid].append(
                     {
                         "cookie": cookie,
-                        "cookie_mask": int(0xFFFFFFFFFFFFFFFF),
-                        "table_id": Table.OFPTT_ALL.value,
+                        "cookie_mask": _COOKIE_MASK,
+                        "table_id": _TABLE_ALL,
                         "owner": "telemetry_int",
                     }
                 )
@@ -833,10 +833,7 @@ class INTManager:
         Removal is driven by the stored flows instead of EVC ids and dpids to also
         be able to handle the force mode when an EVC no longer exists. It also follows
         the same pattern that mef_eline currently uses."""
-        switch_flows = defaultdict(list)
-        for flows in stored_flows.values():
-            for flow in flows:
-                switch_flows[flow["switch"]].append(flow["flow"])
+        switch_flows = utils.group_flows_by_switch(stored_flows)
         await self._send_flows(switch_flows, "delete")
         return switch_flows
 
@@ -844,10 +841,7 @@ class INTManager:
         self, stored_flows: dict[int, list[dict]]
     ) -> dict[str, list[dict]]:
         """Install INT flow mods."""
-        switch_flows = defaultdict(list)
-        for flows in stored_flows.values():
-            for flow in flows:
-                switch_flows[flow["switch"]].append(flow["flow"])
+        switch_flows = utils.group_flows_by_switch(stored_flows)
         await self._send_flows(switch_flows, "install")
         return switch_flows
 
@@ -857,11 +851,12 @@ class INTManager:
         """
         Send batched flows by dpid to flow_manager.
         """
+        event_name = f"kytos.flow_manager.flows.single.{cmd}"
         for dpid, flows in switch_flows.items():
             if flows:
                 await self.controller.buffers.app.aput(
                     KytosEvent(
-                        f"kytos.flow_manager.flows.single.{cmd}",
+                        event_name,
                         content={
                             "dpid": dpid,
                             "force": True,
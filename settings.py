@@ -10,8 +10,32 @@ IPv4 = 2048
 TCP = 6
 UDP = 17
 
-TABLE_GROUP_ALLOWED = {"evpl", "epl"}
+TABLE_GROUP_ALLOWED = frozenset({"evpl", "epl"})
 
 # Fallback to mef_eline by removing INT flows if an external loop goes down. If
 # the loop goes UP again and the EVC is active, it'll install INT flows
 FALLBACK_TO_MEF_LOOP_DOWN = True
+
+# OFPT_ERRORs of INT flows are coalesced by EVC during this interval in seconds
+# before INT gets disabled, so an error storm results in a single removal per EVC
+OFPT_ERROR_DEBOUNCE_INTERVAL = 0.05
+
+# EVCs already handled due to OFPT_ERROR are cached during this TTL in seconds,
+# so subsequent OFPT_ERRORs of the same EVC don't query mef_eline again
+OFPT_ERROR_EVC_CACHE_TTL = 0.5
+
+# Connection pool limits of the httpx clients used on each NApp API
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 60
+# Max seconds to wait for the httpx clients to be closed on shutdown
+HTTP_CLOSE_TIMEOUT = 5
+
+# EVCs requested by ids are fetched individually up to this many ids, otherwise a
+# single get_evcs is used. Archived EVCs are always fetched individually with at
+# most GET_EVC_CONCURRENCY requests at once since get_evcs doesn't list them
+GET_EVCS_BY_IDS_MAX = 1
+GET_EVC_CONCURRENCY = 10
+
+# get_evcs results of proxy port events are shared during this TTL in seconds
+EVCS_CACHE_TTL = 0.1
@@ -1,6 +1,10 @@
 """Conftest."""
 
 import json
+from functools import partial
+from typing import AsyncIterator, Callable
+
+import httpx
 import pytest
 
 
@@ -561,3 +565,33 @@ def inter_evc_evpl_flows_data() -> None:
 }
 """
     return json.loads(data)
+
+
+@pytest.fixture
+async def httpx_transport(
+    monkeypatch,
+) -> AsyncIterator[Callable[..., list[httpx.Request]]]:
+    """Route httpx.AsyncClient requests to an in-process httpx.MockTransport.
+
+    It yields a function that takes the httpx.Response args to reply with, and
+    that returns the list where the sent requests get appended to.
+    """
+    client_cls, clients = httpx.AsyncClient, {}
+    monkeypatch.setattr("napps.kytos.telemetry_int.kytos_api_helper._clients", clients)
+
+    def reply(status_code: int, **kwargs) -> list[httpx.Request]:
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(status_code, **kwargs)
+
+        transport = httpx.MockTransport(handler)
+        monkeypatch.setattr(
+            "httpx.AsyncClient", partial(client_cls, transport=transport)
+        )
+        return requests
+
+    yield reply
+    for client in clients.values():
+        await client.aclose()
@@ -54,6 +54,14 @@ class TestINTManager:
         pp = int_manager.get_proxy_port_or_raise(intf_id, evc_id)
         assert pp.source == mock_interface_b
 
+        # A found ProxyPort is reused from the cache without looking it up again
+        cache = {}
+        assert int_manager.get_proxy_port_or_raise(intf_id, evc_id, cache=cache) is pp
+        assert cache == {intf_id: pp}
+        controller.get_interface_by_id = MagicMock()
+        assert int_manager.get_proxy_port_or_raise(intf_id, evc_id, cache=cache) is pp
+        assert not controller.get_interface_by_id.call_count
+
     def test_load_uni_src_proxy_port(self) -> None:
         """Test test_load_uni_src_proxy_port."""
         dpid_a = "00:00:00:00:00:00:00:01"
@@ -134,6 +142,57 @@ class TestINTManager:
             "3766c105686748",
         }
 
+    def test_lock_for(self) -> None:
+        """Test _lock_for."""
+        int_manager = INTManager(MagicMock())
+        pp_a, pp_b = MagicMock(), MagicMock()
+        pp_a.source.id, pp_b.source.id = "intf_a", "intf_b"
+        assert int_manager._lock_for(pp_a) is int_manager._lock_for(pp_a)
+        assert int_manager._lock_for(pp_a) is not int_manager._lock_for(pp_b)
+
+    async def test_prefetched_lock(self) -> None:
+        """Test _prefetched_lock."""
+        int_manager = INTManager(MagicMock())
+        pp = MagicMock()
+        pp.source.id, pp.evc_ids = "intf_a", {"1"}
+        fetch = AsyncMock(return_value={"1": {}, "2": {}})
+
+        async with int_manager._prefetched_lock(pp, fetch) as evcs:
+            assert int_manager._lock_for(pp).locked()
+            assert list(evcs) == ["1"]
+        assert fetch.call_count == 1
+        assert int_manager._pp_gens["intf_a"] == 1
+
+        async def fetch_handled_meanwhile():
+            int_manager._pp_gens["intf_a"] += 1
+            return {"1": {}}
+
+        fetch.side_effect = fetch_handled_meanwhile
+        async with int_manager._prefetched_lock(pp, fetch) as evcs:
+            assert list(evcs) == ["1"]
+        assert fetch.call_count == 3
+        assert not int_manager._lock_for(pp).locked()
+
+    async def test_get_pp_int_evcs(self, monkeypatch):
+        """Test _get_pp_int_evcs."""
+        int_manager = INTManager(MagicMock())
+        api_mock, pp_mock = AsyncMock(), MagicMock()
+        monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
+        pp_mock.evc_ids = {"1", "3"}
+        api_mock.get_evcs_cached.return_value = {
+            "1": {"metadata": {"telemetry": {"enabled": True, "status": "UP"}}},
+            "2": {"metadata": {"telemetry": {"enabled": True, "status": "UP"}}},
+        }
+        evcs = await int_manager._get_pp_int_evcs(pp_mock, "UP")
+        assert list(evcs) == ["1"]
+        assert evcs["1"] == api_mock.get_evcs_cached.return_value["1"]
+        assert evcs["1"] is not api_mock.get_evcs_cached.return_value["1"]
+        assert api_mock.get_evcs_cached.call_count == 1
+        assert api_mock.get_evcs_cached.call_args[1] == {
+            "metadata.telemetry.enabled": "true",
+            "metadata.telemetry.status": "UP",
+        }
+
     async def test_handle_pp_link_down(self, monkeypatch):
         """Test test_handle_pp_link_down."""
         int_manager = INTManager(MagicMock())
@@ -144,16 +203,13 @@ class TestINTManager:
         pp_mock.evc_ids = {evc_id}
 
         monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
-        api_mock.get_evcs.return_value = {evc_id: {}}
+        api_mock.get_evcs_cached.return_value = {
+            evc_id: {"metadata": {"telemetry": {"enabled": True, "status": "UP"}}}
+        }
         int_manager.remove_int_flows = AsyncMock()
 
         await int_manager.handle_pp_link_down(link_mock)
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_args[1] == {
-            "metadata.telemetry.enabled": "true",
-            "metadata.telemetry.status": "UP",
-        }
+        assert api_mock.get_evcs_cached.call_count == 1
         assert int_manager.remove_int_flows.call_count == 1
         args = int_manager.remove_int_flows.call_args[0]
         assert evc_id in args[0]
@@ -182,10 +238,11 @@ class TestINTManager:
         pp_mock.evc_ids = {evc_id}
 
         monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
-        api_mock.get_evcs.return_value = {
+        api_mock.get_evcs_cached.return_value = {
             evc_id: {
                 "active": True,
                 "archived": False,
+                "metadata": {"telemetry": {"enabled": True, "status": "DOWN"}},
                 "uni_a": {"interface_id": uni_a_id},
                 "uni_z": {"interface_id": uni_z_id},
             }
@@ -194,11 +251,7 @@ class TestINTManager:
         int_manager._validate_map_enable_evcs = MagicMock()
 
         await int_manager.handle_pp_link_up(link_mock)
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_args[1] == {
-            "metadata.telemetry.enabled": "true",
-            "metadata.telemetry.status": "DOWN",
-        }
+        assert api_mock.get_evcs_cached.call_count == 1
         assert int_manager.install_int_flows.call_count == 1
         args = int_manager.install_int_flows.call_args[0]
         assert "telemetry" in args[1]
@@ -209,6 +262,21 @@ class TestINTManager:
         assert telemetry_dict["status"] == "UP"
         assert not telemetry_dict["status_reason"]
 
+    async def test_handle_pp_link_up_not_up(self, monkeypatch):
+        """Test handle_pp_link_up when the link isn't UP."""
+        int_manager = INTManager(MagicMock())
+        api_mock, link_mock, pp_mock = AsyncMock(), MagicMock(), MagicMock()
+        link_mock.endpoint_a.id = "3"
+        link_mock.status = EntityStatus.DOWN
+        int_manager.srcs_pp["3"] = pp_mock
+        pp_mock.evc_ids = {"3766c105686748"}
+        monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
+        int_manager.install_int_flows = AsyncMock()
+
+        await int_manager.handle_pp_link_up(link_mock)
+        assert not api_mock.get_evcs_cached.call_count
+        assert not int_manager.install_int_flows.call_count
+
     async def test_handle_pp_metadata_removed(self, monkeypatch):
         """Test handle_pp_metadata_removed."""
         int_manager = INTManager(MagicMock())
@@ -222,16 +290,13 @@ class TestINTManager:
 
         assert "proxy_port" not in intf_mock.metadata
         monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
-        api_mock.get_evcs.return_value = {evc_id: {}}
+        api_mock.get_evcs_cached.return_value = {
+            evc_id: {"metadata": {"telemetry": {"enabled": True, "status": "UP"}}}
+        }
         int_manager.disable_int = AsyncMock()
 
         await int_manager.handle_pp_metadata_removed(intf_mock)
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_args[1] == {
-            "metadata.telemetry.enabled": "true",
-            "metadata.telemetry.status": "UP",
-        }
+        assert api_mock.get_evcs_cached.call_count == 1
         assert int_manager.disable_int.call_count == 1
         args = int_manager.disable_int.call_args[0]
         assert evc_id in args[0]
@@ -250,14 +315,16 @@ class TestINTManager:
 
         assert "proxy_port" in intf_mock.metadata
         monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
-        api_mock.get_evcs.return_value = {evc_id: {}}
+        api_mock.get_evcs_cached.return_value = {evc_id: {}}
         int_manager.disable_int = AsyncMock()
         int_manager.enable_int = AsyncMock()
 
         await int_manager.handle_pp_metadata_added(intf_mock)
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_args[1] == {"metadata.telemetry.enabled": "true"}
+        assert api_mock.get_evcs_cached.call_count == 1
+        assert api_mock.get_evcs_cached.call_count == 1
+        assert api_mock.get_evcs_cached.call_args[1] == {
+            "metadata.telemetry.enabled": "true"
+        }
         assert int_manager.disable_int.call_count == 1
         assert int_manager.enable_int.call_count == 1
 
@@ -280,12 +347,12 @@ class TestINTManager:
 
         assert "proxy_port" in intf_mock.metadata
         monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
-        api_mock.get_evcs.return_value = {evc_id: {}}
+        api_mock.get_evcs_cached.return_value = {evc_id: {}}
         int_manager.disable_int = AsyncMock()
         int_manager.enable_int = AsyncMock()
 
         await int_manager.handle_pp_metadata_added(intf_mock)
-        assert not api_mock.get_evcs.call_count
+        assert not api_mock.get_evcs_cached.call_count
         assert not int_manager.disable_int.call_count
         assert not int_manager.enable_int.call_count
 
@@ -305,14 +372,14 @@ class TestINTManager:
         monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
 
         # Simulating returning no EVCs that were enabled and UP
-        api_mock.get_evcs.return_value = {}
+        api_mock.get_evcs_cached.return_value = {}
         int_manager.disable_int = AsyncMock()
         int_manager.enable_int = AsyncMock()
 
         await int_manager.handle_pp_metadata_added(intf_mock)
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_args[1] == {
+        assert api_mock.get_evcs_cached.call_count == 1
+        assert api_mock.get_evcs_cached.call_count == 1
+        assert api_mock.get_evcs_cached.call_args[1] == {
             "metadata.telemetry.enabled": "true",
         }
         assert not int_manager.disable_int.call_count
@@ -334,15 +401,17 @@ class TestINTManager:
 
         assert "proxy_port" in intf_mock.metadata
         monkeypatch.setattr("napps.kytos.telemetry_int.managers.int.api", api_mock)
-        api_mock.get_evcs.return_value = {evc_id: {}}
+        api_mock.get_evcs_cached.return_value = {evc_id: {}}
         int_manager.disable_int = AsyncMock()
         int_manager.enable_int = AsyncMock()
         int_manager.enable_int.side_effect = ProxyPortShared(evc_id, "shared")
 
         await int_manager.handle_pp_metadata_added(intf_mock)
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_count == 1
-        assert api_mock.get_evcs.call_args[1] == {"metadata.telemetry.enabled": "true"}
+        assert api_mock.get_evcs_cached.call_count == 1
+        assert api_mock.get_evcs_cached.call_count == 1
+        assert api_mock.get_evcs_cached.call_args[1] == {
+            "metadata.telemetry.enabled": "true"
+        }
         assert int_manager.disable_int.call_count == 1
         assert int_manager.enable_int.call_count == 1
 
@@ -388,8 +457,8 @@ class TestINTManager:
         evcs = {
             "3766c105686749": {
                 "active": True,
-                "uni_a": MagicMock(),
-                "uni_z": MagicMock(),
+                "uni_a": {"proxy_port": MagicMock(status=EntityStatus.UP)},
+                "uni_z": {"proxy_port": MagicMock(status=EntityStatus.UP)},
             }
         }
         int_manager._validate_map_enable_evcs = MagicMock()
@@ -404,7 +473,7 @@ class TestINTManager:
         await int_manager.enable_int(evcs, False)
 
         assert stored_flows_mock.call_count == 1
-        assert api_mock.add_evcs_metadata.call_count == 3
+        assert api_mock.add_evcs_metadata.call_count == 1
         args = api_mock.add_evcs_metadata.call_args[0]
         assert "telemetry" in args[1]
         telemetry_dict = args[1]["telemetry"]
@@ -562,6 +631,13 @@ class TestINTManager:
         assert pp.evc_ids.add.call_count == 2
         pp.evc_ids.add.assert_called_with(evc_id)
 
+        evcs[evc_id]["uni_a"]["proxy_port"] = pp
+        evcs[evc_id]["uni_z"]["proxy_port"] = pp
+        int_manager._add_pps_evc_ids(evcs)
+        assert int_manager.get_proxy_port_or_raise.call_count == 2
+        assert pp.evc_ids.add.call_count == 4
+        assert int_manager.unis_src[intf_id_a] == pp.source.id
+
     def test__discard_pps_evc_ids(self):
         """test_discard_pps_evc_ids."""
         dpid_a = "00:00:00:00:00:00:00:01"
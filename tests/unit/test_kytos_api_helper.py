@@ -1,61 +1,183 @@
 """Test kytos_api_helper.py"""
 
-from httpx import Response
+import asyncio
+import json
 from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from napps.kytos.telemetry_int import kytos_api_helper, settings
+from napps.kytos.telemetry_int.exceptions import UnrecoverableError
 from napps.kytos.telemetry_int.kytos_api_helper import (
+    aclose_clients,
     add_evcs_metadata,
     add_proxy_port_metadata,
     delete_proxy_port_metadata,
     get_evc,
+    get_evcs_by_ids,
+    get_evcs_cached,
     get_stored_flows,
     get_evcs,
 )
 
 
-async def test_get_evcs(evcs_data, monkeypatch) -> None:
+@pytest.fixture(name="clients", autouse=True)
+def fixture_clients(monkeypatch) -> dict:
+    """Isolate the pooled clients and the EVCs cache on each test."""
+    clients = {}
+    monkeypatch.setattr(kytos_api_helper, "_clients", clients)
+    monkeypatch.setattr(kytos_api_helper, "_evcs_cache", {})
+    return clients
+
+
+async def test_get_evcs(evcs_data, httpx_transport) -> None:
     """Test get_evcs."""
-    aclient_mock, awith_mock = AsyncMock(), MagicMock()
-    aclient_mock.get.return_value = Response(200, json=evcs_data, request=MagicMock())
-    awith_mock.return_value.__aenter__.return_value = aclient_mock
-    monkeypatch.setattr("httpx.AsyncClient", awith_mock)
+    requests = httpx_transport(200, json=evcs_data)
     data = await get_evcs()
-    assert aclient_mock.get.call_args[0][0] == "/evc/?archived=false"
+    assert len(requests) == 1
+    assert requests[0].method == "GET"
+    assert requests[0].url == f"{settings.mef_eline_api}/evc/?archived=false"
     assert data == evcs_data
 
 
-async def test_get_evc(evcs_data, monkeypatch) -> None:
+async def test_get_evcs_cached(evcs_data, monkeypatch) -> None:
+    """Test get_evcs_cached."""
+    get_evcs_mock = AsyncMock(return_value=evcs_data)
+    monkeypatch.setattr(
+        "napps.kytos.telemetry_int.kytos_api_helper.get_evcs", get_evcs_mock
+    )
+    query = {"metadata.telemetry.enabled": "true"}
+
+    results = await asyncio.gather(*(get_evcs_cached(**query) for _ in range(3)))
+    assert all(data == evcs_data for data in results)
+    assert results[0] is results[1] is results[2]
+    assert await get_evcs_cached(**query) is results[0]
+    assert get_evcs_mock.call_count == 1
+    assert get_evcs_mock.call_args[1] == query
+
+    await get_evcs_cached(**query, **{"metadata.telemetry.status": "UP"})
+    assert get_evcs_mock.call_count == 2
+
+    kytos_api_helper._evcs_cache.clear()
+    await get_evcs_cached(**query)
+    assert get_evcs_mock.call_count == 3
+
+
+async def test_get_evcs_cached_failed(monkeypatch) -> None:
+    """Test get_evcs_cached doesn't cache failures."""
+    get_evcs_mock = AsyncMock(side_effect=[UnrecoverableError("boom"), {}])
+    monkeypatch.setattr(
+        "napps.kytos.telemetry_int.kytos_api_helper.get_evcs", get_evcs_mock
+    )
+    with pytest.raises(UnrecoverableError):
+        await get_evcs_cached()
+    assert not kytos_api_helper._evcs_cache
+    assert await get_evcs_cached() == {}
+    assert get_evcs_mock.call_count == 2
+
+
+async def test_pooled_clients(clients, monkeypatch) -> None:
+    """Test clients are pooled by base_url and closed."""
+    aclient_mock, client_cls_mock = AsyncMock(), MagicMock()
+    aclient_mock.is_closed = False
+    client_cls_mock.return_value = aclient_mock
+    monkeypatch.setattr("httpx.AsyncClient", client_cls_mock)
+
+    client = kytos_api_helper._get_client("http://localhost")
+    assert kytos_api_helper._get_client("http://localhost") is client
+    assert client_cls_mock.call_count == 1
+    assert clients == {"http://localhost": client}
+
+    await aclose_clients()
+    assert aclient_mock.aclose.call_count == 1
+    assert not clients
+
+
+async def test_get_evc(evcs_data, httpx_transport) -> None:
     """Test get_evc."""
     evc_id = "3766c105686749"
     evc_data = evcs_data[evc_id]
 
-    aclient_mock, awith_mock = AsyncMock(), MagicMock()
-    aclient_mock.get.return_value = Response(200, json=evc_data, request=MagicMock())
-    awith_mock.return_value.__aenter__.return_value = aclient_mock
-    monkeypatch.setattr("httpx.AsyncClient", awith_mock)
+    requests = httpx_transport(200, json=evc_data)
 
     data = await get_evc(evc_id)
-    assert aclient_mock.get.call_args[0][0] == f"/evc/{evc_id}"
+    assert requests[0].url == f"{settings.mef_eline_api}/evc/{evc_id}"
     assert data[evc_id] == evc_data
 
 
-async def test_get_stored_flows(monkeypatch, intra_evc_evpl_flows_data) -> None:
+async def test_get_evcs_by_ids(evcs_data, monkeypatch) -> None:
+    """Test get_evcs_by_ids."""
+    evc_id, missing_id = "3766c105686749", "missing_id"
+    get_evc_mock = AsyncMock()
+    get_evc_mock.side_effect = [{evc_id: evcs_data[evc_id]}, {}]
+    monkeypatch.setattr(
+        "napps.kytos.telemetry_int.kytos_api_helper.get_evc", get_evc_mock
+    )
+
+    data = await get_evcs_by_ids([evc_id, missing_id], exclude_archived=False)
+    assert get_evc_mock.call_count == 2
+    assert list(data) == [evc_id, missing_id]
+    assert data[evc_id] == evcs_data[evc_id]
+    assert data[missing_id] == {}
+
+
+async def test_get_evcs_by_ids_above_max(evcs_data, monkeypatch) -> None:
+    """Test get_evcs_by_ids above GET_EVCS_BY_IDS_MAX uses a single get_evcs."""
+    evc_id = "3766c105686749"
+    evc_ids = [evc_id] + [f"missing_{i}" for i in range(settings.GET_EVCS_BY_IDS_MAX)]
+    get_evc_mock, get_evcs_mock = AsyncMock(), AsyncMock(return_value=evcs_data)
+    monkeypatch.setattr(
+        "napps.kytos.telemetry_int.kytos_api_helper.get_evc", get_evc_mock
+    )
+    monkeypatch.setattr(
+        "napps.kytos.telemetry_int.kytos_api_helper.get_evcs", get_evcs_mock
+    )
+
+    data = await get_evcs_by_ids(evc_ids)
+    assert get_evcs_mock.call_count == 1
+    assert not get_evc_mock.call_count
+    assert list(data) == evc_ids
+    assert data[evc_id] == evcs_data[evc_id]
+    assert not any(data[missing_id] for missing_id in evc_ids[1:])
+
+
+async def test_get_evcs_by_ids_concurrency(monkeypatch) -> None:
+    """Test get_evcs_by_ids bounds its concurrent get_evc requests."""
+    in_flight, max_in_flight = 0, 0
+
+    async def fake_get_evc(evc_id, _exclude_archived) -> dict:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return {evc_id: {"id": evc_id}}
+
+    monkeypatch.setattr(
+        "napps.kytos.telemetry_int.kytos_api_helper.get_evc", fake_get_evc
+    )
+    monkeypatch.setattr("napps.kytos.telemetry_int.settings.GET_EVC_CONCURRENCY", 2)
+    evc_ids = [str(i) for i in range(settings.GET_EVCS_BY_IDS_MAX + 5)]
+
+    data = await get_evcs_by_ids(evc_ids, exclude_archived=False)
+    assert list(data) == evc_ids
+    assert max_in_flight == 2
+
+
+async def test_get_stored_flows(httpx_transport, intra_evc_evpl_flows_data) -> None:
     """Test get_stored_flows."""
     evc_data = intra_evc_evpl_flows_data
     dpid = "00:00:00:00:00:00:00:01"
     cookies = [evc_data[dpid][0]["flow"]["cookie"]]
 
-    aclient_mock, awith_mock = AsyncMock(), MagicMock()
-    aclient_mock.request.return_value = Response(
-        200, json=intra_evc_evpl_flows_data, request=MagicMock()
-    )
-    awith_mock.return_value.__aenter__.return_value = aclient_mock
-    monkeypatch.setattr("httpx.AsyncClient", awith_mock)
+    requests = httpx_transport(200, json=intra_evc_evpl_flows_data)
 
     data = await get_stored_flows(cookies)
+    assert requests[0].method == "GET"
     assert (
-        aclient_mock.request.call_args[0][1] == "/stored_flows?"
+        requests[0].url == f"{settings.flow_manager_api}/stored_flows?"
         "state=installed&state=pending"
     )
+    assert json.loads(requests[0].content) == {"cookie_range": cookies * 2}
     assert len(data) == 1
     assert list(data.keys()) == cookies
     assert len(data[cookies[0]]) == 2
@@ -65,25 +187,22 @@ async def test_get_stored_flows(monkeypatch, intra_evc_evpl_flows_data) -> None:
 
 
 async def test_get_stored_flows_no_cookies_filter(
-    monkeypatch, intra_evc_evpl_flows_data
+    httpx_transport, intra_evc_evpl_flows_data
 ) -> None:
     """Test get_stored_flows no cookies."""
     evc_data = intra_evc_evpl_flows_data
     dpid = "00:00:00:00:00:00:00:01"
     cookies = [evc_data[dpid][0]["flow"]["cookie"]]
 
-    aclient_mock, awith_mock = AsyncMock(), MagicMock()
-    aclient_mock.get.return_value = Response(
-        200, json=intra_evc_evpl_flows_data, request=MagicMock()
-    )
-    awith_mock.return_value.__aenter__.return_value = aclient_mock
-    monkeypatch.setattr("httpx.AsyncClient", awith_mock)
+    requests = httpx_transport(200, json=intra_evc_evpl_flows_data)
 
     data = await get_stored_flows()
+    assert requests[0].method == "GET"
     assert (
-        aclient_mock.get.call_args[0][0] == "/stored_flows?"
+        requests[0].url == f"{settings.flow_manager_api}/stored_flows?"
         "state=installed&state=pending"
     )
+    assert not requests[0].content
     assert len(data) == 1
     assert list(data.keys()) == cookies
     assert len(data[cookies[0]]) == 2
@@ -92,42 +211,50 @@ async def test_get_stored_flows_no_cookies_filter(
             assert flow["switch"] == dpid
 
 
-async def test_add_evcs_metadata(monkeypatch):
+async def test_add_evcs_metadata(httpx_transport):
     """test add_evcs_metadata."""
-    aclient_mock, awith_mock = AsyncMock(), MagicMock()
     resp = "Operation successful"
-    aclient_mock.post.return_value = Response(201, json=resp, request=MagicMock())
-    awith_mock.return_value.__aenter__.return_value = aclient_mock
-    monkeypatch.setattr("httpx.AsyncClient", awith_mock)
+    requests = httpx_transport(201, json=resp)
 
     data = await add_evcs_metadata({}, {"some_key": "some_val"})
     assert not data
+    assert not requests
 
+    kytos_api_helper._evcs_cache[frozenset()] = (0, MagicMock())
     data = await add_evcs_metadata(
         {"some_id": {"id": "some_id"}}, {"some_key": "some_val"}
     )
     assert data == resp
+    assert requests[0].method == "POST"
+    assert requests[0].url == f"{settings.mef_eline_api}/evc/metadata"
+    assert json.loads(requests[0].content) == {
+        "some_key": "some_val",
+        "circuit_ids": ["some_id"],
+    }
+    assert not kytos_api_helper._evcs_cache
 
 
-async def test_add_proxy_port_metadata(monkeypatch):
+async def test_add_proxy_port_metadata(httpx_transport):
     """test add_proxy_port_metadata."""
-    aclient_mock, awith_mock = AsyncMock(), MagicMock()
     resp = "Operation successful"
-    aclient_mock.post.return_value = Response(201, json=resp, request=MagicMock())
-    awith_mock.return_value.__aenter__.return_value = aclient_mock
-    monkeypatch.setattr("httpx.AsyncClient", awith_mock)
+    requests = httpx_transport(201, json=resp)
     intf_id, port_no = "00:00:00:00:00:00:00:01:1", 7
     data = await add_proxy_port_metadata(intf_id, port_no)
     assert data
+    assert requests[0].method == "POST"
+    assert requests[0].url == f"{settings.topology_url}/interfaces/{intf_id}/metadata"
+    assert json.loads(requests[0].content) == {"proxy_port": port_no}
 
 
-async def test_delete_proxy_port_metadata(monkeypatch):
+async def test_delete_proxy_port_metadata(httpx_transport):
     """test delete_proxy_port_metadata."""
-    aclient_mock, awith_mock = AsyncMock(), MagicMock()
     resp = "Operation successful"
-    aclient_mock.post.return_value = Response(201, json=resp, request=MagicMock())
-    awith_mock.return_value.__aenter__.return_value = aclient_mock
-    monkeypatch.setattr("httpx.AsyncClient", awith_mock)
+    requests = httpx_transport(200, json=resp)
     intf_id = "00:00:00:00:00:00:00:01:1"
     data = await delete_proxy_port_metadata(intf_id)
     assert data
+    assert requests[0].method == "DELETE"
+    assert (
+        requests[0].url
+        == f"{settings.topology_url}/interfaces/{intf_id}/metadata/proxy_port"
+    )
@@ -1,11 +1,14 @@
 """Test Main methods."""
 
+import asyncio
+import concurrent.futures
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from napps.kytos.telemetry_int import utils
 from napps.kytos.telemetry_int.exceptions import EVCError, ProxyPortShared
 from napps.kytos.telemetry_int.main import Main
+from tenacity import RetryError
 
 from kytos.core.common import EntityStatus
 from kytos.core.events import KytosEvent
@@ -34,14 +37,19 @@ class TestMain:
         )
 
         evc_id = utils.get_id_from_cookie(flow.cookie)
-        api_mock.get_evcs.return_value = {
+        api_mock.get_evcs_by_ids.return_value = {
             evc_id: {"metadata": {"telemetry": {"enabled": False}}}
         }
 
         self.napp.int_manager = AsyncMock()
 
         endpoint = f"{self.base_endpoint}/evc/enable"
-        response = await self.api_client.post(endpoint, json={"evc_ids": [evc_id]})
+        response = await self.api_client.post(
+            endpoint, json={"evc_ids": [evc_id, evc_id]}
+        )
+        assert api_mock.get_evcs_by_ids.call_count == 1
+        assert api_mock.get_evcs_by_ids.call_args[0][0] == [evc_id]
+        assert api_mock.get_stored_flows.call_args[0][0] == [flow.cookie]
         assert self.napp.int_manager.enable_int.call_count == 1
         assert self.napp.int_manager._remove_int_flows_by_cookies.call_count == 1
         assert response.status_code == 201
@@ -57,7 +65,7 @@ class TestMain:
         )
 
         evc_id = utils.get_id_from_cookie(flow.cookie)
-        api_mock.get_evc.return_value = {
+        api_mock.get_evcs_by_ids.return_value = {
             evc_id: {"metadata": {"telemetry": {"enabled": True}}}
         }
 
@@ -83,7 +91,7 @@ class TestMain:
         )
 
         evc_id = utils.get_id_from_cookie(flow.cookie)
-        api_mock.get_evc.return_value = {
+        api_mock.get_evcs_by_ids.return_value = {
             evc_id: {"metadata": {"telemetry": {"enabled": False}}}
         }
 
@@ -114,7 +122,7 @@ class TestMain:
         )
 
         evc_id = utils.get_id_from_cookie(flow.cookie)
-        api_mock.get_evcs.return_value = {
+        api_mock.get_evcs_by_ids.return_value = {
             evc_id: {"metadata": {"telemetry": {"enabled": True}}}
         }
 
@@ -126,6 +134,51 @@ class TestMain:
         assert response.status_code == 200
         assert response.json() == [evc_id]
 
+    async def test_disable_telemetry_all(self, monkeypatch) -> None:
+        """Test disable telemetry on all INT EVCs."""
+        api_mock = AsyncMock()
+        monkeypatch.setattr(
+            "napps.kytos.telemetry_int.main.api",
+            api_mock,
+        )
+
+        evc_id = "1"
+        api_mock.get_evcs.return_value = {
+            evc_id: {"metadata": {"telemetry": {"enabled": True}}}
+        }
+
+        self.napp.int_manager = AsyncMock()
+
+        endpoint = f"{self.base_endpoint}/evc/disable"
+        response = await self.api_client.post(endpoint, json={"evc_ids": []})
+        assert api_mock.get_evcs.call_args[1] == {"metadata.telemetry.enabled": "true"}
+        assert not api_mock.get_evcs_by_ids.call_count
+        assert self.napp.int_manager.disable_int.call_count == 1
+        assert response.status_code == 200
+        assert response.json() == [evc_id]
+
+        api_mock.get_evcs.return_value = {}
+        response = await self.api_client.post(endpoint, json={"evc_ids": []})
+        assert self.napp.int_manager.disable_int.call_count == 1
+        assert response.status_code == 200
+        assert response.json() == []
+
+    async def test_redeploy_telemetry_all_not_found(self, monkeypatch) -> None:
+        """Test redeploy telemetry on all INT EVCs when there are none."""
+        api_mock = AsyncMock()
+        monkeypatch.setattr(
+            "napps.kytos.telemetry_int.main.api",
+            api_mock,
+        )
+        api_mock.get_evcs.return_value = {}
+        self.napp.int_manager = AsyncMock()
+
+        endpoint = f"{self.base_endpoint}/evc/redeploy"
+        response = await self.api_client.patch(endpoint, json={"evc_ids": []})
+        assert api_mock.get_evcs.call_args[1] == {"metadata.telemetry.enabled": "true"}
+        assert not self.napp.int_manager.redeploy_int.call_count
+        assert response.status_code == 404
+
     async def test_get_enabled_evcs(self, monkeypatch) -> None:
         """Test get enabled evcs."""
         api_mock, flow = AsyncMock(), MagicMock()
@@ -504,9 +557,11 @@ class TestMain:
     async def test_on_evc_deleted(self) -> None:
         """Test on_evc_deleted."""
         content = {"metadata": {"telemetry": {"enabled": True}}, "id": "some_id"}
+        self.napp._ofpt_evcs_handled["some_id"] = 1.0
         self.napp.int_manager.disable_int = AsyncMock()
         await self.napp.on_evc_deleted(KytosEvent(content=content))
         assert self.napp.int_manager.disable_int.call_count == 1
+        assert "some_id" not in self.napp._ofpt_evcs_handled
 
     async def test_on_uni_active_updated(self, monkeypatch) -> None:
         """Test on UNI active updated."""
@@ -543,8 +598,10 @@ class TestMain:
         assert self.napp.int_manager.remove_int_flows.call_count == 0
 
         content["metadata"]["telemetry"]["enabled"] = True
+        self.napp._ofpt_evcs_handled["some_id"] = 1.0
         await self.napp.on_evc_undeployed(KytosEvent(content=content))
         assert self.napp.int_manager.remove_int_flows.call_count == 1
+        assert "some_id" not in self.napp._ofpt_evcs_handled
 
     async def test_on_evc_redeployed_link(self) -> None:
         """Test on redeployed_link_down|redeployed_link_up."""
@@ -602,6 +659,64 @@ class TestMain:
         await self.napp.on_link_up(KytosEvent(content={"link": MagicMock()}))
         assert self.napp.int_manager.handle_pp_link_up.call_count == 1
 
+    async def test_on_link_coalesced(self) -> None:
+        """Test link events are coalesced while the same link is being handled."""
+        handling = asyncio.Event()
+
+        async def handle_pp_link_down(_link) -> None:
+            await handling.wait()
+
+        link_down_mock = AsyncMock(side_effect=handle_pp_link_down)
+        self.napp.int_manager.handle_pp_link_down = link_down_mock
+        self.napp.int_manager.handle_pp_link_up = AsyncMock()
+        link, latest_link = MagicMock(id="1"), MagicMock(id="1")
+
+        task = asyncio.create_task(
+            self.napp.on_link_down(KytosEvent(content={"link": link}))
+        )
+        await asyncio.sleep(0)
+        await self.napp.on_link_up(KytosEvent(content={"link": link}))
+        await self.napp.on_link_down(KytosEvent(content={"link": latest_link}))
+        assert self.napp._topo_pending[("link", "1")][1] is latest_link
+
+        handling.set()
+        await task
+        assert link_down_mock.call_count == 2
+        assert link_down_mock.call_args[0][0] is latest_link
+        assert not self.napp.int_manager.handle_pp_link_up.call_count
+        assert not self.napp._topo_handling
+        assert not self.napp._topo_pending
+
+    async def test_on_link_coalesced_handler_error(self, monkeypatch) -> None:
+        """Test a pending link event is still handled if the current one fails."""
+        log_mock = MagicMock()
+        monkeypatch.setattr("napps.kytos.telemetry_int.main.log", log_mock)
+        handling = asyncio.Event()
+
+        async def handle_pp_link_down(_link) -> None:
+            await handling.wait()
+            raise RetryError(MagicMock())
+
+        link_down_mock = AsyncMock(side_effect=handle_pp_link_down)
+        self.napp.int_manager.handle_pp_link_down = link_down_mock
+        self.napp.int_manager.handle_pp_link_up = AsyncMock()
+        link = MagicMock(id="1")
+
+        task = asyncio.create_task(
+            self.napp.on_link_down(KytosEvent(content={"link": link}))
+        )
+        await asyncio.sleep(0)
+        await self.napp.on_link_up(KytosEvent(content={"link": link}))
+
+        handling.set()
+        await task
+        assert link_down_mock.call_count == 1
+        assert log_mock.exception.call_count == 1
+        assert self.napp.int_manager.handle_pp_link_up.call_count == 1
+        assert self.napp.int_manager.handle_pp_link_up.call_args[0][0] is link
+        assert not self.napp._topo_handling
+        assert not self.napp._topo_pending
+
     async def test_on_table_enabled_error(self, monkeypatch) -> None:
         """Test on_table_enabled error case."""
         assert self.napp.int_manager.flow_builder.table_group == {"evpl": 2, "epl": 3}
@@ -626,21 +741,134 @@ class TestMain:
             "napps.kytos.telemetry_int.managers.int.api",
             api_mock_int,
         )
+        monkeypatch.setattr(
+            "napps.kytos.telemetry_int.settings.OFPT_ERROR_DEBOUNCE_INTERVAL", 0
+        )
         cookie = utils.get_id_from_cookie(flow.cookie)
-        api_mock_main.get_evc.return_value = {
+        api_mock_main.get_evcs_by_ids.return_value = {
             cookie: {"metadata": {"telemetry": {"enabled": True}}}
         }
         api_mock_int.get_stored_flows.return_value = {cookie: [MagicMock()]}
         self.napp.int_manager._remove_int_flows_by_cookies = AsyncMock()
 
-        event = KytosEvent(content={"flow": flow, "error_command": "add"})
-        await self.napp.on_flow_mod_error(event)
+        # the same EVC errors get coalesced into a single removal
+        for _ in range(3):
+            event = KytosEvent(content={"flow": flow, "error_command": "add"})
+            await self.napp.on_flow_mod_error(event)
+        assert len(self.napp._ofpt_error_tasks) == 1
+        await asyncio.gather(*self.napp._ofpt_error_tasks)
 
-        assert api_mock_main.get_evc.call_count == 1
+        assert not self.napp._ofpt_errors
+        assert api_mock_main.get_evcs_by_ids.call_count == 1
+        assert api_mock_main.get_evcs_by_ids.call_args[0][0] == [cookie]
         assert api_mock_int.get_stored_flows.call_count == 1
         assert api_mock_int.add_evcs_metadata.call_count == 1
         assert self.napp.int_manager._remove_int_flows_by_cookies.call_count == 1
 
+        # a handled EVC isn't fetched again while it's cached
+        assert cookie in self.napp._ofpt_evcs_handled
+        await self.napp.on_flow_mod_error(event)
+        assert not self.napp._ofpt_errors
+        assert not self.napp._ofpt_error_tasks
+
+    async def test_on_flow_mod_error_failed(self, monkeypatch) -> None:
+        """Test on_flow_mod_error failed removal isn't cached as handled."""
+        api_mock, flow, log_mock = AsyncMock(), MagicMock(), MagicMock()
+        flow.cookie = 0xA800000000000001
+        monkeypatch.setattr("napps.kytos.telemetry_int.main.api", api_mock)
+        monkeypatch.setattr("napps.kytos.telemetry_int.main.log", log_mock)
+        monkeypatch.setattr(
+            "napps.kytos.telemetry_int.settings.OFPT_ERROR_DEBOUNCE_INTERVAL", 0
+        )
+        evc_id = utils.get_id_from_cookie(flow.cookie)
+        api_mock.get_evcs_by_ids.return_value = {
+            evc_id: {"metadata": {"telemetry": {"enabled": True}}}
+        }
+        self.napp.int_manager.remove_int_flows = AsyncMock(
+            side_effect=ValueError("boom")
+        )
+
+        event = KytosEvent(content={"flow": flow, "error_command": "add"})
+        await self.napp.on_flow_mod_error(event)
+        await asyncio.gather(*self.napp._ofpt_error_tasks)
+        assert log_mock.exception.call_count == 1
+        assert evc_id not in self.napp._ofpt_evcs_handled
+
+    def test_shutdown(self, monkeypatch) -> None:
+        """Test shutdown from another thread waits on _ashutdown with a timeout."""
+        run_mock, log_mock = MagicMock(), MagicMock()
+        monkeypatch.setattr("asyncio.run_coroutine_threadsafe", run_mock)
+        monkeypatch.setattr("napps.kytos.telemetry_int.main.log", log_mock)
+        self.napp._ashutdown = MagicMock()
+        self.napp.shutdown()
+        future = run_mock.return_value
+        assert future.result.call_args[1] == {"timeout": 5}
+        assert not log_mock.warning.call_count
+
+        future.result.side_effect = concurrent.futures.TimeoutError
+        self.napp.shutdown()
+        assert future.cancel.call_count == 1
+        assert log_mock.warning.call_count == 1
+
+    async def test_shutdown_on_loop(self, monkeypatch) -> None:
+        """Test shutdown from the controller loop doesn't block it."""
+        api_mock = AsyncMock()
+        monkeypatch.setattr("napps.kytos.telemetry_int.main.api", api_mock)
+        self.napp.controller.loop = asyncio.get_running_loop()
+        task = asyncio.create_task(asyncio.sleep(10))
+        self.napp._ofpt_error_tasks.add(task)
+
+        self.napp.shutdown()
+        assert not api_mock.aclose_clients.call_count
+        await self.napp._shutdown_task
+        assert task.cancelled()
+        assert api_mock.aclose_clients.call_count == 1
+
+    async def test_ashutdown(self, monkeypatch) -> None:
+        """Test _ashutdown cancels OFPT_ERROR tasks and closes clients."""
+        api_mock = AsyncMock()
+        monkeypatch.setattr("napps.kytos.telemetry_int.main.api", api_mock)
+        task = asyncio.create_task(asyncio.sleep(10))
+        self.napp._ofpt_error_tasks.add(task)
+        await self.napp._ashutdown()
+        assert task.cancelled()
+        assert api_mock.aclose_clients.call_count == 1
+
+    async def test_on_flow_mod_error_ignored(self, monkeypatch) -> None:
+        """Test on_flow_mod_error ignored cases."""
+        api_mock, flow = AsyncMock(), MagicMock()
+        monkeypatch.setattr(
+            "napps.kytos.telemetry_int.main.api",
+            api_mock,
+        )
+        monkeypatch.setattr(
+            "napps.kytos.telemetry_int.settings.OFPT_ERROR_DEBOUNCE_INTERVAL", 0
+        )
+        self.napp.int_manager.remove_int_flows = AsyncMock()
+
+        # mef_eline cookie
+        flow.cookie = 0xAA00000000000001
+        event = KytosEvent(content={"flow": flow, "error_command": "add"})
+        await self.napp.on_flow_mod_error(event)
+        assert not self.napp._ofpt_errors
+
+        # not an OFPT_ERROR
+        flow.cookie = 0xA800000000000001
+        event = KytosEvent(
+            content={"flow": flow, "error_command": "add", "error_exception": "boom"}
+        )
+        await self.napp.on_flow_mod_error(event)
+        assert not self.napp._ofpt_errors
+
+        # EVC without INT enabled
+        evc_id = utils.get_id_from_cookie(flow.cookie)
+        api_mock.get_evcs_by_ids.return_value = {evc_id: {"metadata": {}}}
+        event = KytosEvent(content={"flow": flow, "error_command": "add"})
+        await self.napp.on_flow_mod_error(event)
+        await asyncio.gather(*self.napp._ofpt_error_tasks)
+        assert api_mock.get_evcs_by_ids.call_count == 1
+        assert not self.napp.int_manager.remove_int_flows.call_count
+
     async def test_on_mef_eline_evcs_loaded(self):
         """Test on_mef_eline_evcs_loaded."""
         evcs = {"1": {}, "2": {}}
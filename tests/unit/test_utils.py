@@ -1,8 +1,8 @@
 """Test utils."""
 
 import pytest
-from httpx import Response
-from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime
+from unittest.mock import AsyncMock
 from napps.kytos.telemetry_int import utils
 from napps.kytos.telemetry_int.exceptions import FlowsNotFound, PriorityOverflow
 
@@ -76,6 +76,21 @@ def test_get_new_cookie(cookie, expected) -> None:
     assert utils.get_new_cookie(cookie) == expected
 
 
+@pytest.mark.parametrize(
+    "evc_id,cookie_prefix,expected",
+    [
+        ("3766c105686749", 0xAA, 0xAA3766C105686749),
+        ("3766c105686749", 0xA8, 0xA83766C105686749),
+    ],
+)
+def test_get_cookie(evc_id, cookie_prefix, expected) -> None:
+    """test get_cookie."""
+    utils.get_cookie.cache_clear()
+    cookie = utils.get_cookie(evc_id, cookie_prefix)
+    assert cookie == expected
+    assert utils.get_cookie(evc_id, cookie_prefix) is cookie
+
+
 @pytest.mark.parametrize(
     "cookie,expected_evc_id",
     [
@@ -108,6 +123,51 @@ def test_has_int_enabled(evc_dict, expected) -> None:
     assert utils.has_int_enabled(evc_dict) == expected
 
 
+def test_get_int_mef_cookie() -> None:
+    """Test get_int_cookie and get_mef_cookie."""
+    evc_id = "3766c105686749"
+    assert utils.get_int_cookie(evc_id) == 0xA83766C105686749
+    assert utils.get_mef_cookie(evc_id) == 0xAA3766C105686749
+
+
+def test_get_utc_now_str() -> None:
+    """Test get_utc_now_str."""
+    fmt = "%Y-%m-%dT%H:%M:%S"
+    now_str = utils.get_utc_now_str()
+    assert datetime.strptime(now_str, fmt).strftime(fmt) == now_str
+
+
+def test_get_status_metadata() -> None:
+    """Test get_status_metadata."""
+    metadata = utils.get_status_metadata(False, "DOWN", ["no_flows"], "some_ts")
+    assert metadata == {
+        "telemetry": {
+            "enabled": False,
+            "status": "DOWN",
+            "status_reason": ["no_flows"],
+            "status_updated_at": "some_ts",
+        }
+    }
+    metadata = utils.get_status_metadata(True, "UP", [])
+    assert metadata["telemetry"]["status_updated_at"]
+
+
+def test_group_flows_by_switch() -> None:
+    """Test group_flows_by_switch."""
+    dpid_a, dpid_b = "00:00:00:00:00:00:00:01", "00:00:00:00:00:00:00:02"
+    stored_flows = {
+        1: [
+            {"switch": dpid_a, "flow": {"cookie": 1, "priority": 1}},
+            {"switch": dpid_b, "flow": {"cookie": 1, "priority": 2}},
+        ],
+        2: [{"switch": dpid_a, "flow": {"cookie": 2, "priority": 3}}],
+    }
+    assert utils.group_flows_by_switch(stored_flows) == {
+        dpid_a: [{"cookie": 1, "priority": 1}, {"cookie": 2, "priority": 3}],
+        dpid_b: [{"cookie": 1, "priority": 2}],
+    }
+
+
 def test_get_evc_unis() -> None:
     """test get_evc_unis."""
     evc = {
@@ -261,7 +321,9 @@ def test_modify_actions(actions, actions_to_change, remove, expected_actions) ->
     assert utils.modify_actions(actions, actions_to_change, remove) == expected_actions
 
 
-async def test_get_found_stored_flows(monkeypatch, intra_evc_evpl_flows_data) -> None:
+async def test_get_found_stored_flows(
+    httpx_transport, intra_evc_evpl_flows_data
+) -> None:
     """test get_found_stored_flows."""
     evc_data = intra_evc_evpl_flows_data
     dpid = "00:00:00:00:00:00:00:01"
@@ -270,14 +332,10 @@ async def test_get_found_stored_flows(monkeypatch, intra_evc_evpl_flows_data) ->
     cookies = [(c, c) for c in cookies]
     assert cookies
 
-    aclient_mock, awith_mock = AsyncMock(), MagicMock()
-    aclient_mock.request.return_value = Response(
-        200, json=intra_evc_evpl_flows_data, request=MagicMock()
-    )
-    awith_mock.return_value.__aenter__.return_value = aclient_mock
-    monkeypatch.setattr("httpx.AsyncClient", awith_mock)
+    requests = httpx_transport(200, json=intra_evc_evpl_flows_data)
 
     resp = await utils.get_found_stored_flows(cookies)
+    assert len(requests) == 1
     assert resp
     for cookie, _cookie in cookies:
         assert cookie in resp
@@ -1,5 +1,9 @@
 """ Support function for main.py """
 
+import time
+from collections import defaultdict
+from functools import lru_cache
+from itertools import chain
 from typing import Optional
 
 from napps.kytos.telemetry_int import settings
@@ -18,6 +22,35 @@ async def get_found_stored_flows(cookies: list[int] = None) -> dict[int, list[di
     return stored_flows
 
 
+def get_utc_now_str() -> str:
+    """Return the current UTC time formatted as %Y-%m-%dT%H:%M:%S.
+
+    time.gmtime is used to avoid instantiating a datetime, and the deprecated
+    datetime.utcnow, for this fixed format.
+    """
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+
+def get_status_metadata(
+    enabled: bool,
+    status: str,
+    status_reason: list[str],
+    status_updated_at: Optional[str] = None,
+) -> dict:
+    """Get telemetry status metadata.
+
+    status_updated_at defaults to the current UTC time.
+    """
+    return {
+        "telemetry": {
+            "enabled": enabled,
+            "status": status,
+            "status_reason": status_reason,
+            "status_updated_at": status_updated_at or get_utc_now_str(),
+        }
+    }
+
+
 def has_int_enabled(evc: dict) -> bool:
     """Check if evc has telemetry."""
     return (
@@ -29,6 +62,14 @@ def has_int_enabled(evc: dict) -> bool:
     )
 
 
+def group_flows_by_switch(stored_flows: dict[int, list[dict]]) -> dict[str, list[dict]]:
+    """Group the flows of stored flows by switch dpid keeping their order."""
+    switch_flows = defaultdict(list)
+    for flow in chain.from_iterable(stored_flows.values()):
+        switch_flows[flow["switch"]].append(flow["flow"])
+    return switch_flows
+
+
 def get_evc_unis(evc: dict) -> tuple[dict, dict]:
     """Parse evc for unis."""
     uni_a_split = evc["uni_a"]["interface_id"].split(":")
@@ -75,15 +116,27 @@ def has_instruction_and_action_type(
     return False
 
 
+@lru_cache(maxsize=16384)
 def get_cookie(evc_id: str, cookie_prefix: int) -> int:
     """Return the cookie integer from evc id.
 
     cookie_prefix is supposed to be the reserved byte value that
-    mef_eline or telemetry_int uses.
+    mef_eline or telemetry_int uses. Results are memoized since the same
+    EVC ids are repeatedly converted when enabling, disabling or redeploying.
     """
     return int(evc_id, 16) + (cookie_prefix << 56)
 
 
+def get_int_cookie(evc_id: str) -> int:
+    """Return the telemetry_int cookie integer from evc id."""
+    return get_cookie(evc_id, settings.INT_COOKIE_PREFIX)
+
+
+def get_mef_cookie(evc_id: str) -> int:
+    """Return the mef_eline cookie integer from evc id."""
+    return get_cookie(evc_id, settings.MEF_COOKIE_PREFIX)
+
+
 def get_id_from_cookie(cookie: int) -> str:
     """Return the evc id given a cookie value."""
     evc_id = cookie & 0xFFFFFFFFFFFFFF
@@ -168,11 +221,9 @@ def set_instructions_from_actions(flow: dict) -> dict:
 
 def get_svlan_dpid_link(link: dict, dpid: str) -> Optional[int]:
     """Try to get svlan of a link if a dpid matches one of the endpoints."""
-    if any(
-        (
-            link["endpoint_a"]["switch"] == dpid and "s_vlan" in link["metadata"],
-            link["endpoint_b"]["switch"] == dpid and "s_vlan" in link["metadata"],
-        )
+    if "s_vlan" in link["metadata"] and dpid in (
+        link["endpoint_a"]["switch"],
+        link["endpoint_b"]["switch"],
     ):
         return link["metadata"]["s_vlan"]["value"]
     return None